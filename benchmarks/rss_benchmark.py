@@ -0,0 +1,384 @@
+"""
+Offline benchmark for the RSS cog's feed pipeline: fetch, parse, tag building, templating and posting.
+
+A local aiohttp server serves synthetic RSS 2.0, Atom and RDF feeds, and fake channels record what would have been
+posted, so nothing here touches the internet or Discord. The cog's own Config is kept in a temporary folder.
+Run from the repository root with Red-DiscordBot installed:
+
+    python -m benchmarks.rss_benchmark --feeds 500 --workers 16 --latency-ms 100
+
+Every feed gets new entries on each request. The first sweep only seeds the seen-entry index and isn't counted,
+the rest are reported with feeds/sec, p50/p99 per-feed latency and the number of messages sent.
+"""
+import argparse
+import asyncio
+import html
+import logging
+import math
+import random
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+from aiohttp import web
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+
+FORMATS = ["rss", "atom", "rdf"]
+
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris. "
+)
+
+BASE_TIME = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+# 1x1 transparent png for embed image checks
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d4944415478da63f8ffff3f0005fe02fea7356a810000000049454e44ae426082"
+)
+
+
+class FeedServer:
+    """Local aiohttp server for synthetic feeds, listening on one port per fake website host."""
+
+    def __init__(self, args):
+        self.args = args
+        self.requests = 0
+        self.errors = 0
+        self.ports = []
+        # newest entry number per feed id, moved forward on every request so that each check finds new entries
+        self._heads = {}
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/feed/{kind}/{feed_id}.xml", self._feed)
+        app.router.add_get("/image.png", self._image)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        for _ in range(self.args.hosts):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            await web.SockSite(self._runner, sock).start()
+            self.ports.append(sock.getsockname()[1])
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    def feed_url(self, feed_id: int):
+        kind = self.args.format if self.args.format != "mixed" else FORMATS[feed_id % len(FORMATS)]
+        port = self.ports[feed_id % len(self.ports)]
+        return f"http://127.0.0.1:{port}/feed/{kind}/{feed_id}.xml"
+
+    async def _image(self, request):
+        return web.Response(body=PNG_BYTES, content_type="image/png")
+
+    async def _feed(self, request):
+        self.requests += 1
+        if self.args.latency_ms:
+            await asyncio.sleep(self.args.latency_ms / 1000 * random.uniform(0.5, 1.5))
+        if random.random() < self.args.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+
+        feed_id = int(request.match_info["feed_id"])
+        head = self._heads.get(feed_id, self.args.entries) + self.args.new_entries
+        self._heads[feed_id] = head
+        numbers = range(head, max(head - self.args.entries, 0), -1)
+        image_url = f"http://{request.host}/image.png"
+        entries = [self._entry(feed_id, number, image_url) for number in numbers]
+
+        kind = request.match_info["kind"]
+        if kind == "atom":
+            body = self._atom(feed_id, entries)
+            content_type = "application/atom+xml"
+        elif kind == "rdf":
+            body = self._rdf(feed_id, entries)
+            content_type = "application/rdf+xml"
+        else:
+            body = self._rss(feed_id, entries)
+            content_type = "application/rss+xml"
+        return web.Response(text=body, content_type=content_type)
+
+    def _entry(self, feed_id: int, number: int, image_url: str):
+        paragraphs = []
+        size = 0
+        while size < self.args.entry_size:
+            paragraph = f"<p>{LOREM}</p>"
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        content = f'<p><img src="{image_url}" alt="entry image"></p>' + "".join(paragraphs)
+        return SimpleNamespace(
+            title=f"Feed {feed_id} entry {number}",
+            link=f"http://example.invalid/{feed_id}/{number}",
+            guid=f"feed-{feed_id}-entry-{number}",
+            time=BASE_TIME + timedelta(minutes=number),
+            content=content,
+        )
+
+    @staticmethod
+    def _rss(feed_id: int, entries: list):
+        items = "".join(
+            f"<item><title>{entry.title}</title><link>{entry.link}</link>"
+            f'<guid isPermaLink="false">{entry.guid}</guid>'
+            f"<pubDate>{format_datetime(entry.time)}</pubDate>"
+            f"<description><![CDATA[{entry.content}]]></description></item>"
+            for entry in entries
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Feed {feed_id}</title><link>http://example.invalid/{feed_id}</link>"
+            f"<description>Synthetic feed {feed_id}</description>{items}</channel></rss>"
+        )
+
+    @staticmethod
+    def _atom(feed_id: int, entries: list):
+        items = "".join(
+            f'<entry><title>{entry.title}</title><link href="{entry.link}"/><id>{entry.guid}</id>'
+            f"<updated>{entry.time.isoformat()}</updated>"
+            f'<summary type="html">{html.escape(entry.content)}</summary></entry>'
+            for entry in entries
+        )
+        updated = entries[0].time.isoformat() if entries else BASE_TIME.isoformat()
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>Feed {feed_id}</title><link href="http://example.invalid/{feed_id}"/>'
+            f"<id>feed-{feed_id}</id><updated>{updated}</updated>{items}</feed>"
+        )
+
+    @staticmethod
+    def _rdf(feed_id: int, entries: list):
+        items = "".join(
+            f'<item rdf:about="{entry.link}"><title>{entry.title}</title><link>{entry.link}</link>'
+            f"<dc:date>{entry.time.isoformat()}</dc:date>"
+            f"<description>{html.escape(entry.content)}</description></item>"
+            for entry in entries
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<channel rdf:about="http://example.invalid/{feed_id}"><title>Feed {feed_id}</title>'
+            f"<link>http://example.invalid/{feed_id}</link><description>Synthetic feed {feed_id}</description>"
+            f"</channel>{items}</rdf:RDF>"
+        )
+
+
+class FakeChannel:
+    """Stands in for a discord.TextChannel, counting what would have been sent."""
+
+    def __init__(self, channel_id: int, guild):
+        self.id = channel_id
+        self.name = f"bench-{channel_id}"
+        self.mention = f"<#{channel_id}>"
+        self.guild = guild
+        self.messages = 0
+        self.embeds = 0
+
+    def permissions_for(self, member):
+        return SimpleNamespace(send_messages=True, embed_links=True)
+
+    async def send(self, content=None, *, embed=None, embeds=None):
+        self.messages += 1
+        self.embeds += (1 if embed else 0) + len(embeds or [])
+
+
+class FakeBot:
+    def __init__(self, args):
+        self.args = args
+        self.loop = asyncio.get_running_loop()
+        guild = SimpleNamespace(id=1, me=SimpleNamespace(id=1))
+        self.channels = {channel_id: FakeChannel(channel_id, guild) for channel_id in range(1, args.channels + 1)}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id, None)
+
+    async def fetch_channel(self, channel_id: int):
+        return self.channels.get(channel_id, None)
+
+    async def cog_disabled_in_guild(self, cog, guild):
+        return False
+
+    async def embed_requested(self, channel, user):
+        return self.args.embeds
+
+    async def wait_until_red_ready(self):
+        return
+
+    def dispatch(self, event_name, *args, **kwargs):
+        return
+
+
+def _percentile(values: list, percent: float):
+    if not values:
+        return 0.0
+    # nearest-rank percentile
+    values = sorted(values)
+    index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+def _peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _setup_cog(args, bot, server, data_path: str):
+    from redbot.core import data_manager
+
+    data_manager.basic_config = data_manager.basic_config_default.copy()
+    data_manager.basic_config["DATA_PATH"] = data_path
+
+    from rss.rss import RSS
+    from rss.rss_feed import RssFeed
+
+    cog = RSS(bot)
+    await cog.config.scheduler_workers.set(args.workers)
+    await cog.config.scheduler_host_limit.set(args.host_limit)
+    await cog.config.scheduler_rate_limit.set(0)
+    await cog.config.parse_workers.set(args.parse_workers)
+    await cog.config.parse_offload_size.set(args.parse_offload_size)
+    await cog._load_parse_settings()
+    if args.storage == "sqlite":
+        cog._store = await cog._open_sqlite_store()
+
+    for feed_id in range(args.feeds):
+        channel_id = feed_id % args.channels + 1
+        rss_feed = RssFeed(
+            name=f"feed{feed_id}",
+            url=server.feed_url(feed_id),
+            template=args.template,
+            embed=args.embeds,
+            embed_image="content_image01" if args.embed_images else None,
+        )
+        await cog._store.set_feed(channel_id, rss_feed.name, rss_feed.to_json())
+    return cog
+
+
+async def _run_sweep(cog, workers: int):
+    """One pass over every feed, like the concurrent scheduler but without waiting out the 5 minute window."""
+    from rss.scheduler import HostLimiter, RateLimiter
+
+    await cog._put_feeds_in_queue()
+    queue_items = []
+    while True:
+        queue_item = await cog._get_next_in_queue()
+        if not queue_item:
+            break
+        queue_items.append(queue_item[2])
+
+    host_limiter = HostLimiter(await cog.config.scheduler_host_limit())
+    rate_limiter = RateLimiter(0)
+    semaphore = asyncio.Semaphore(max(workers, 1))
+    latencies = []
+
+    async def check(rss_feed):
+        async with semaphore:
+            start = time.perf_counter()
+            url = rss_feed.feed_data["url"]
+            validators = cog._get_feed_validators(rss_feed.feed_data)
+            try:
+                feedparser_obj, validators = await cog._fetch_feed_for_sweep(url, validators, host_limiter, rate_limiter)
+                await cog.get_current_feed(
+                    rss_feed.channel,
+                    rss_feed.feed_name,
+                    rss_feed.feed_data,
+                    feedparser_obj=feedparser_obj,
+                    validators=validators,
+                )
+            except Exception:
+                logging.getLogger("red.aikaterna.rss").exception(f"Benchmark check failed for {url}")
+            latencies.append(time.perf_counter() - start)
+
+    sweep_start = time.perf_counter()
+    await asyncio.gather(*(check(rss_feed) for rss_feed in queue_items))
+    await cog._post_buffer.flush_all()
+    return time.perf_counter() - sweep_start, latencies
+
+
+async def main(args):
+    logging.basicConfig(level=logging.WARNING)
+    random.seed(args.seed)
+    server = FeedServer(args)
+    await server.start()
+    bot = FakeBot(args)
+
+    with tempfile.TemporaryDirectory(prefix="rss_benchmark_") as data_path:
+        cog = await _setup_cog(args, bot, server, data_path)
+        try:
+            print(
+                f"{args.feeds} {args.format} feeds in {args.channels} channels on {args.hosts} hosts, "
+                f"{args.entries} entries of ~{args.entry_size} bytes, {args.new_entries} new per check, "
+                f"{args.latency_ms} ms latency, {args.error_rate:.0%} errors, "
+                f"{args.workers or 'serial'} workers, {args.storage} storage"
+            )
+            await _run_sweep(cog, args.workers)
+            print("sweep  seconds  feeds/sec  p50 ms  p99 ms  messages")
+            all_latencies = []
+            total_time = 0.0
+            for sweep in range(1, args.sweeps + 1):
+                messages_before = sum(channel.messages for channel in bot.channels.values())
+                seconds, latencies = await _run_sweep(cog, args.workers)
+                messages = sum(channel.messages for channel in bot.channels.values()) - messages_before
+                all_latencies.extend(latencies)
+                total_time += seconds
+                print(
+                    f"{sweep:>5}  {seconds:>7.2f}  {len(latencies) / seconds:>9.1f}  "
+                    f"{_percentile(latencies, 50) * 1000:>6.0f}  {_percentile(latencies, 99) * 1000:>6.0f}  "
+                    f"{messages:>8}"
+                )
+            print(
+                f"total  {total_time:>7.2f}  {len(all_latencies) / total_time:>9.1f}  "
+                f"{_percentile(all_latencies, 50) * 1000:>6.0f}  {_percentile(all_latencies, 99) * 1000:>6.0f}"
+            )
+            peak_memory = _peak_memory_mb()
+            if peak_memory is not None:
+                print(f"peak memory: {peak_memory:.1f} MB")
+            print(f"server: {server.requests} requests, {server.errors} errors")
+        finally:
+            await cog._session.close()
+            await cog._store.close()
+            cog._parse_executor.shutdown(wait=True)
+            await server.stop()
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the RSS cog's feed pipeline.")
+    parser.add_argument("--feeds", type=int, default=200, help="number of feeds")
+    parser.add_argument("--channels", type=int, default=20, help="number of fake channels the feeds are spread over")
+    parser.add_argument("--hosts", type=int, default=4, help="number of fake website hosts (local ports)")
+    parser.add_argument("--format", choices=FORMATS + ["mixed"], default="mixed", help="feed format")
+    parser.add_argument("--entries", type=int, default=20, help="entries per feed document")
+    parser.add_argument("--entry-size", type=int, default=2000, help="approximate html bytes per entry")
+    parser.add_argument("--new-entries", type=int, default=1, help="new entries per feed on every check")
+    parser.add_argument("--latency-ms", type=float, default=50, help="average server response delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--sweeps", type=int, default=3, help="measured sweeps after the warm-up sweep")
+    parser.add_argument("--workers", type=int, default=0, help="concurrent feed checks, 0 for serial")
+    parser.add_argument("--host-limit", type=int, default=8, help="concurrent requests per host")
+    parser.add_argument("--parse-workers", type=int, default=2, help="background parse pool size")
+    parser.add_argument("--parse-offload-size", type=int, default=50000, help="parse in the pool from this size")
+    parser.add_argument("--template", default="$title\n$link\n$summary_plaintext", help="feed template")
+    parser.add_argument("--embeds", action="store_true", help="post feeds as embeds")
+    parser.add_argument("--embed-images", action="store_true", help="set $content_image01 as the embed image")
+    parser.add_argument("--storage", choices=["config", "sqlite"], default="config", help="feed storage engine")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for latency and errors")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
@@ -8,4 +8,4 @@ __red_end_user_data_statement__ = "This cog does not persistently store data or
 async def setup(bot: commands.Bot):
     n = RSS(bot)
     bot.add_cog(n)
-    n.initialize()
+    await n.initialize()
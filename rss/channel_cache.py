@@ -0,0 +1,59 @@
+import discord
+
+from .cache import TTLCache
+
+
+class ChannelCache:
+    """
+    Channels the feed loop can post in, resolved once instead of on every sweep.
+
+    Results stay cached until a channel, role or guild event says the channel or the bot's permissions changed.
+    Channels that couldn't be fetched at all are retried after `retry_after` seconds,
+    so a deleted channel with feeds left in it doesn't cost a request every sweep.
+    """
+
+    def __init__(self, bot, retry_after: float = 3600):
+        self.bot = bot
+        # channel id: channel, or None if the bot can't post there
+        self._channels = {}
+        # guild id: set of channel ids, for dropping a whole guild when the bot's roles change
+        self._guild_channels = {}
+        self._unreachable = TTLCache(maxsize=4096, ttl=retry_after)
+
+    async def get_channel(self, channel_id: int):
+        """The channel, if the bot can send messages in it."""
+        if channel_id in self._channels:
+            return self._channels[channel_id]
+        if channel_id in self._unreachable:
+            return None
+
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            try:
+                channel = await self.bot.fetch_channel(channel_id)
+            except (discord.errors.Forbidden, discord.errors.NotFound):
+                self._unreachable.set(channel_id, True)
+                return None
+
+        usable = channel if channel.permissions_for(channel.guild.me).send_messages else None
+        self._channels[channel_id] = usable
+        self._guild_channels.setdefault(channel.guild.id, set()).add(channel_id)
+        return usable
+
+    def invalidate_channel(self, channel_id: int):
+        self._channels.pop(channel_id, None)
+        self._unreachable.pop(channel_id)
+
+    def invalidate_guild(self, guild_id: int):
+        for channel_id in self._guild_channels.pop(guild_id, ()):
+            self._channels.pop(channel_id, None)
+        # channels the bot couldn't see may be visible now
+        self._unreachable.clear()
+
+    def clear(self):
+        self._channels.clear()
+        self._guild_channels.clear()
+        self._unreachable.clear()
+
+    def __len__(self):
+        return len(self._channels)
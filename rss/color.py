@@ -1,4 +1,3 @@
-from math import sqrt
 import discord
 import re
 import webcolors
@@ -35,34 +34,47 @@ _RGB_NAME_MAP = {webcolors.hex_to_rgb(hexcode): name for hexcode, name in webcol
 _RGB_NAME_MAP.update(_DISCORD_COLOURS)
 
 
-def _distance(point_a: tuple, point_b: tuple):
+class _ColorTree:
     """
-    Euclidean distance between two points using rgb values as the metric space.
+    k-d tree over the rgb points of every named colour, built once at import.
+    Nearest-name lookups check a handful of colours instead of all of them.
     """
-    # rgb values
-    x1, y1, z1 = point_a
-    x2, y2, z2 = point_b
 
-    # distances
-    dx = x1 - x2
-    dy = y1 - y2
-    dz = z1 - z2
-
-    # final distance
-    return sqrt(dx**2 + dy**2 + dz**2)
-
-def _linear_nearest_neighbour(all_points: list, pivot: tuple):
-    """
-    Check distance against all points from the pivot and return the distance and nearest point.
-    """
-    best_dist = None
-    nearest = None
-    for point in all_points:
-        dist = _distance(point, pivot)
-        if best_dist is None or dist < best_dist:
-            best_dist = dist
-            nearest = point
-    return best_dist, nearest
+    def __init__(self, points: list):
+        # the insertion index breaks ties the same way a front to back scan of the points would
+        self._root = self._build(list(enumerate(points)), 0)
+
+    def _build(self, items: list, depth: int):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[1][axis])
+        median = len(items) // 2
+        index, point = items[median]
+        return (point, index, axis, self._build(items[:median], depth + 1), self._build(items[median + 1 :], depth + 1))
+
+    def nearest(self, pivot: tuple):
+        """Returns the point closest to the pivot by euclidean distance in rgb space."""
+        best = None
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, index, axis, left, right = node
+            dist = (point[0] - pivot[0]) ** 2 + (point[1] - pivot[1]) ** 2 + (point[2] - pivot[2]) ** 2
+            if best is None or (dist, index) < best[:2]:
+                best = (dist, index, point)
+            diff = pivot[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # the far side can only hold a closer (or tied) point if the splitting plane is close enough
+            if diff * diff <= best[0]:
+                stack.append(far)
+            stack.append(near)
+        return best[2]
+
+
+_COLOR_TREE = _ColorTree(list(_RGB_NAME_MAP.keys()))
 
 
 class Color:
@@ -104,10 +116,26 @@ class Color:
         hex_code = await self._hex_validator(hex_code)
         rgb_tuple = await self._hex_to_rgb(hex_code)
 
-        positions = list(_RGB_NAME_MAP.keys())
-        dist, nearest = _linear_nearest_neighbour(positions, rgb_tuple)
+        return _RGB_NAME_MAP[_COLOR_TREE.nearest(rgb_tuple)]
 
-        return _RGB_NAME_MAP[nearest]
+    async def _hex_to_css3_names(self, hex_codes: list):
+        """
+        Batch version of _hex_to_css3_name
+        Input:  [0xFFFFFF, None, ...]
+        Output: [CSS3 color name string closest match, None, ...] with None for missing or invalid hex codes
+        """
+        names = []
+        nearest_cache = {}
+        for hex_code in hex_codes:
+            hex_code = await self._hex_validator(hex_code) if hex_code else None
+            if not hex_code:
+                names.append(None)
+                continue
+            if hex_code not in nearest_cache:
+                rgb_tuple = await self._hex_to_rgb(hex_code)
+                nearest_cache[hex_code] = _RGB_NAME_MAP[_COLOR_TREE.nearest(rgb_tuple)]
+            names.append(nearest_cache[hex_code])
+        return names
 
     async def _hex_to_rgb(self, hex_code: str):
         """
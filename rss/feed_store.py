@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from redbot.core import Config
+
+
+log = logging.getLogger("red.aikaterna.rss")
+
+# rows are read from the database this many at a time during a sweep
+STREAM_BATCH_SIZE = 200
+
+
+class ConfigFeedStore:
+    """
+    Feed definitions and cursors stored in Red's Config, under each channel's `feeds` dict.
+    Every write saves the whole feeds dict for the channel.
+    """
+
+    name = "config"
+
+    def __init__(self, config: Config):
+        self.config = config
+
+    async def get_feed(self, channel_id: int, feed_name: str):
+        return await self.config.channel_from_id(channel_id).feeds.get_raw(feed_name, default=None)
+
+    async def get_channel_feeds(self, channel_id: int):
+        return await self.config.channel_from_id(channel_id).feeds()
+
+    async def get_channel_ids(self):
+        return [channel_id for channel_id, data in (await self.config.all_channels()).items() if data["feeds"]]
+
+    async def set_feed(self, channel_id: int, feed_name: str, feed_data: dict):
+        await self.config.channel_from_id(channel_id).feeds.set_raw(feed_name, value=feed_data)
+
+    async def set_feeds(self, channel_id: int, feeds: dict):
+        """Add or replace several feeds in a channel with one save."""
+        async with self.config.channel_from_id(channel_id).feeds() as feed_data:
+            feed_data.update(feeds)
+
+    async def update_feed(self, channel_id: int, feed_name: str, updates: dict):
+        """Returns False if the feed doesn't exist."""
+        async with self.config.channel_from_id(channel_id).feeds() as feed_data:
+            if feed_name not in feed_data:
+                return False
+            feed_data[feed_name].update(updates)
+        return True
+
+    async def remove_feed(self, channel_id: int, feed_name: str):
+        async with self.config.channel_from_id(channel_id).feeds() as feed_data:
+            return feed_data.pop(feed_name, None) is not None
+
+    async def iter_feeds(self):
+        """Yields (channel_id, feed_name, feed_data) for every feed, in channel and then feed order."""
+        all_channels = await self.config.all_channels()
+        for channel_id, data in all_channels.items():
+            for feed_name, feed_data in data["feeds"].items():
+                yield channel_id, feed_name, feed_data
+
+    async def close(self):
+        pass
+
+
+class SQLiteFeedStore:
+    """
+    Feed definitions and cursors stored in a local SQLite database, one row per feed.
+
+    Cursor updates after a feed check only write the one row for that feed, and sweeps read the rows
+    in batches instead of loading every channel at once.
+    All database work runs on a single background thread so the event loop is never blocked on disk.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rss_store")
+        self._conn = None
+        # sweeps read through their own connection so writes made while a sweep is running don't disturb it
+        self._read_conn = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        await self._run(self._open)
+
+    def _open(self):
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS feeds ("
+                "channel_id INTEGER NOT NULL, "
+                "name TEXT NOT NULL, "
+                "position INTEGER NOT NULL, "
+                "url TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (channel_id, name))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS feeds_url ON feeds (url)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS feeds_channel_position ON feeds (channel_id, position)")
+        self._read_conn = sqlite3.connect(str(self.path), check_same_thread=False)
+
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def _close(self):
+        for conn in [self._read_conn, self._conn]:
+            if conn is not None:
+                conn.close()
+        self._conn = self._read_conn = None
+
+    async def get_feed(self, channel_id: int, feed_name: str):
+        return await self._run(self._get_feed, channel_id, feed_name)
+
+    def _get_feed(self, channel_id: int, feed_name: str):
+        row = self._conn.execute(
+            "SELECT data FROM feeds WHERE channel_id = ? AND name = ?", (channel_id, feed_name)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def get_channel_feeds(self, channel_id: int):
+        return await self._run(self._get_channel_feeds, channel_id)
+
+    def _get_channel_feeds(self, channel_id: int):
+        rows = self._conn.execute(
+            "SELECT name, data FROM feeds WHERE channel_id = ? ORDER BY position", (channel_id,)
+        ).fetchall()
+        return {name: json.loads(data) for name, data in rows}
+
+    async def get_channel_ids(self):
+        return await self._run(self._get_channel_ids)
+
+    def _get_channel_ids(self):
+        return [row[0] for row in self._conn.execute("SELECT DISTINCT channel_id FROM feeds").fetchall()]
+
+    async def set_feed(self, channel_id: int, feed_name: str, feed_data: dict):
+        await self._run(self._set_feed, channel_id, feed_name, feed_data)
+
+    def _set_feed(self, channel_id: int, feed_name: str, feed_data: dict):
+        self._set_feeds(channel_id, {feed_name: feed_data})
+
+    async def set_feeds(self, channel_id: int, feeds: dict):
+        """Add or replace several feeds in a channel in one transaction."""
+        await self._run(self._set_feeds, channel_id, feeds)
+
+    def _set_feeds(self, channel_id: int, feeds: dict):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO feeds (channel_id, name, position, url, data) VALUES (?, ?, "
+                "(SELECT COALESCE(MAX(position), -1) + 1 FROM feeds WHERE channel_id = ?), ?, ?) "
+                "ON CONFLICT (channel_id, name) DO UPDATE SET url = excluded.url, data = excluded.data",
+                [
+                    (channel_id, feed_name, channel_id, feed_data["url"], json.dumps(feed_data))
+                    for feed_name, feed_data in feeds.items()
+                ],
+            )
+
+    async def update_feed(self, channel_id: int, feed_name: str, updates: dict):
+        """Returns False if the feed doesn't exist."""
+        return await self._run(self._update_feed, channel_id, feed_name, updates)
+
+    def _update_feed(self, channel_id: int, feed_name: str, updates: dict):
+        with self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM feeds WHERE channel_id = ? AND name = ?", (channel_id, feed_name)
+            ).fetchone()
+            if not row:
+                return False
+            feed_data = json.loads(row[0])
+            feed_data.update(updates)
+            self._conn.execute(
+                "UPDATE feeds SET url = ?, data = ? WHERE channel_id = ? AND name = ?",
+                (feed_data["url"], json.dumps(feed_data), channel_id, feed_name),
+            )
+        return True
+
+    async def remove_feed(self, channel_id: int, feed_name: str):
+        return await self._run(self._remove_feed, channel_id, feed_name)
+
+    def _remove_feed(self, channel_id: int, feed_name: str):
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM feeds WHERE channel_id = ? AND name = ?", (channel_id, feed_name))
+        return cursor.rowcount > 0
+
+    async def iter_feeds(self):
+        """Yields (channel_id, feed_name, feed_data) for every feed, in channel and then feed order."""
+        cursor = await self._run(
+            self._read_conn.execute, "SELECT channel_id, name, data FROM feeds ORDER BY channel_id, position"
+        )
+        try:
+            while True:
+                rows = await self._run(cursor.fetchmany, STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                for channel_id, feed_name, data in rows:
+                    yield channel_id, feed_name, json.loads(data)
+        finally:
+            await self._run(cursor.close)
+
+    async def import_channels(self, all_channels: dict):
+        """Replace everything in the database with Config's all_channels() data, in one transaction."""
+        await self._run(self._import_channels, all_channels)
+
+    def _import_channels(self, all_channels: dict):
+        rows = []
+        for channel_id, data in all_channels.items():
+            for position, (feed_name, feed_data) in enumerate(data["feeds"].items()):
+                rows.append((channel_id, feed_name, position, feed_data["url"], json.dumps(feed_data)))
+        with self._conn:
+            self._conn.execute("DELETE FROM feeds")
+            self._conn.executemany(
+                "INSERT INTO feeds (channel_id, name, position, url, data) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    async def export_channels(self):
+        """Everything in the database in the same {channel_id: {"feeds": {...}}} layout as Config's all_channels()."""
+        all_channels = {}
+        async for channel_id, feed_name, feed_data in self.iter_feeds():
+            all_channels.setdefault(channel_id, {"feeds": {}})["feeds"][feed_name] = feed_data
+        return all_channels
@@ -0,0 +1,102 @@
+import aiohttp
+
+
+# urlfetch/urlfetch.py has a copy of these helpers, keep the two the same
+# content types that can never be a feed or a page to look for feeds in
+BINARY_CONTENT_TYPES = [
+    "application/gzip",
+    "application/pdf",
+    "application/x-tar",
+    "application/zip",
+    "audio/",
+    "font/",
+    "image/",
+    "video/",
+]
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ContentRejected(Exception):
+    def __init__(self, m):
+        self.message = m
+
+    def __str__(self):
+        return self.message
+
+
+def check_response_headers(resp: aiohttp.ClientResponse, max_size: int, *, allowed_types: list = None):
+    """
+    Reject a response before reading the body, based on its Content-Type and Content-Length headers.
+    allowed_types is a list of content type prefixes that are always accepted, like ["image/"] for images.
+    max_size is in bytes, 0 is unlimited.
+    """
+    content_type = resp.content_type.lower()
+    allowed = allowed_types and any(content_type.startswith(allowed_type) for allowed_type in allowed_types)
+    if not allowed and any(content_type.startswith(binary_type) for binary_type in BINARY_CONTENT_TYPES):
+        raise ContentRejected(f"The url returned `{content_type}` content, which can't be read as text.")
+    if max_size and resp.content_length and resp.content_length > max_size:
+        raise ContentRejected(
+            f"The url returned {resp.content_length} bytes of content, which is over the {max_size} byte limit."
+        )
+
+
+async def iter_limited(resp: aiohttp.ClientResponse, max_size: int, *, allowed_types: list = None):
+    """
+    Yield the response body in chunks, stopping with ContentRejected as soon as it goes over max_size bytes.
+    The Content-Length header can be missing or wrong, so the limit is checked against what was actually read.
+    """
+    check_response_headers(resp, max_size, allowed_types=allowed_types)
+    size = 0
+    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+        size += len(chunk)
+        if max_size and size > max_size:
+            raise ContentRejected(f"The url returned more than the {max_size} byte content limit.")
+        yield chunk
+
+
+async def read_limited(resp: aiohttp.ClientResponse, max_size: int, *, allowed_types: list = None):
+    """resp.read() with a size limit."""
+    chunks = []
+    async for chunk in iter_limited(resp, max_size, allowed_types=allowed_types):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+# enough bytes to tell every image type an embed can show apart
+IMAGE_SNIFF_SIZE = 512
+
+IMAGE_CONTENT_TYPES = {
+    "image/gif": "gif",
+    "image/jpeg": "jpeg",
+    "image/jpg": "jpeg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+
+
+def sniff_image_type(data: bytes):
+    """
+    Input:  the first bytes of a file
+    Output: "png", "jpeg", "gif" or "webp" from the file's magic bytes, or None
+    """
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+async def read_head(resp: aiohttp.ClientResponse, size: int):
+    """Read up to the first `size` bytes of the body and leave the rest unread."""
+    data = b""
+    while len(data) < size:
+        chunk = await resp.content.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
@@ -0,0 +1,89 @@
+from collections import deque
+
+
+class _FeedWindow:
+    """Recent measurements for a single feed url."""
+
+    def __init__(self, window: int):
+        self.fetch_times = deque(maxlen=window)
+        self.sizes = deque(maxlen=window)
+        self.parse_times = deque(maxlen=window)
+        self.enrich_times = deque(maxlen=window)
+        self.errors = deque(maxlen=window)
+        self.posted = deque(maxlen=window)
+        self.last_status = None
+
+
+def _average(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+class FeedStats:
+    """
+    Rolling in-memory window of feed check measurements, keyed by feed url.
+    Nothing here is saved: the numbers start over when the cog is loaded.
+    """
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self._feeds = {}
+        self._sweeps = deque(maxlen=window)
+
+    def _get_window(self, url: str):
+        feed_window = self._feeds.get(url, None)
+        if feed_window is None:
+            feed_window = self._feeds[url] = _FeedWindow(self.window)
+        return feed_window
+
+    def record_fetch(self, url: str, *, seconds: float, size: int, status: int, error: bool):
+        feed_window = self._get_window(url)
+        feed_window.fetch_times.append(seconds)
+        feed_window.sizes.append(size)
+        feed_window.errors.append(error)
+        feed_window.last_status = status
+
+    def record_parse(self, url: str, *, seconds: float, error: bool):
+        feed_window = self._get_window(url)
+        feed_window.parse_times.append(seconds)
+        if error and feed_window.errors:
+            # the fetch was fine but the content wasn't a feed, it's still one failed check
+            feed_window.errors[-1] = True
+
+    def record_post(self, url: str, *, enrich_seconds: float, posted: int):
+        feed_window = self._get_window(url)
+        feed_window.enrich_times.append(enrich_seconds)
+        feed_window.posted.append(posted)
+
+    def record_sweep(self, *, seconds: float, feed_count: int):
+        self._sweeps.append((seconds, feed_count))
+
+    def get_last_sweep(self):
+        """Returns (seconds, feed_count) of the last full sweep, or None."""
+        return self._sweeps[-1] if self._sweeps else None
+
+    def get_average_sweep_time(self):
+        return _average([seconds for seconds, _ in self._sweeps])
+
+    def get_feed_summaries(self):
+        """One dict per feed url with averages over the window."""
+        summaries = []
+        for url, feed_window in self._feeds.items():
+            fetch_time = _average(feed_window.fetch_times)
+            parse_time = _average(feed_window.parse_times)
+            enrich_time = _average(feed_window.enrich_times)
+            summaries.append(
+                {
+                    "url": url,
+                    "checks": len(feed_window.fetch_times),
+                    "fetch_time": fetch_time,
+                    "max_fetch_time": max(feed_window.fetch_times, default=0.0),
+                    "size": _average(feed_window.sizes),
+                    "parse_time": parse_time,
+                    "enrich_time": enrich_time,
+                    "total_time": fetch_time + parse_time + enrich_time,
+                    "errors": sum(feed_window.errors),
+                    "posted": sum(feed_window.posted),
+                    "status": feed_window.last_status,
+                }
+            )
+        return summaries
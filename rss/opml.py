@@ -0,0 +1,69 @@
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urlparse
+
+
+# the same declarations in the utf-16 encodings ElementTree also reads
+_DECLARATION_MARKERS = [
+    declaration.encode(encoding)
+    for declaration in ["<!DOCTYPE", "<!ENTITY"]
+    for encoding in ["utf-8", "utf-16-le", "utf-16-be"]
+]
+
+
+class OPMLError(Exception):
+    def __init__(self, m):
+        self.message = m
+
+    def __str__(self):
+        return self.message
+
+
+def _feed_name(name: str, url: str):
+    """Feed names are used as a single command argument, so they can't have spaces."""
+    name = re.sub(r"\s+", "_", (name or "").strip().lower())
+    if not name:
+        # www.site.com/feed -> site
+        host_parts = urlparse(url).netloc.lower().split(".")
+        name = host_parts[-2] if len(host_parts) > 1 else host_parts[0]
+    return name
+
+
+def parse_opml(data: bytes):
+    """
+    Input:  the bytes of an OPML file
+    Output: list of (feed name, feed url) for every outline with an xmlUrl, nested outlines included
+    """
+    if any(marker in data for marker in _DECLARATION_MARKERS):
+        # entity declarations are never needed for OPML, and nested entities can expand to gigabytes
+        raise OPMLError("That file isn't valid OPML: document type and entity declarations aren't allowed.")
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise OPMLError(f"That file isn't valid OPML: {e}")
+    if root.tag != "opml" or root.find("body") is None:
+        raise OPMLError("That file isn't an OPML file, it has no `<opml>` and `<body>` elements.")
+
+    feeds = []
+    for outline in root.find("body").iter("outline"):
+        url = (outline.get("xmlUrl") or "").strip()
+        if not url:
+            # a folder of feeds
+            continue
+        name = outline.get("title") or outline.get("text")
+        feeds.append((_feed_name(name, url), url))
+    return feeds
+
+
+def build_opml(title: str, feeds: list):
+    """
+    Input:  OPML title, list of (feed name, feed url)
+    Output: the bytes of an OPML 2.0 file
+    """
+    root = ET.Element("opml", version="2.0")
+    head = ET.SubElement(root, "head")
+    ET.SubElement(head, "title").text = title
+    body = ET.SubElement(root, "body")
+    for name, url in feeds:
+        ET.SubElement(body, "outline", type="rss", text=name, title=name, xmlUrl=url)
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+
+import discord
+
+
+log = logging.getLogger("red.aikaterna.rss")
+
+MAX_MESSAGE_LENGTH = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_TOTAL_LENGTH = 6000
+# a message that fails with a server error is tried this many times in total before its posts are given up on
+MAX_SEND_ATTEMPTS = 3
+
+
+class _ChannelBuffer:
+    """Posts waiting to go out to one channel, all of them either text or embeds."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.kind = None
+        self.pending = []
+        # callbacks of the pending posts, called with True once the post is sent or False if it couldn't be
+        self.callbacks = []
+        self.length = 0
+        self.lock = asyncio.Lock()
+        self.flush_task = None
+
+
+class PostBuffer:
+    """
+    Per-channel outbound buffer for feed posts.
+
+    Text posts are joined together up to the message length limit and embeds are packed up to 10 per message,
+    so that catching up on a backlog of new entries takes a fraction of the send requests.
+    Posts go out in the order they were added, after flush_delay seconds or as soon as a message is full.
+    Packing several embeds into one message needs discord.py 2, on 1.x each embed is still its own message.
+    """
+
+    def __init__(self, flush_delay: float = 2.0):
+        self.flush_delay = flush_delay
+        self._buffers = {}
+
+    def _get_buffer(self, channel):
+        buffer = self._buffers.get(channel.id, None)
+        if buffer is None:
+            buffer = self._buffers[channel.id] = _ChannelBuffer(channel)
+        return buffer
+
+    async def add_text(self, channel: discord.TextChannel, text: str, *, callback=None):
+        """
+        text must already fit in one message.
+        callback is called with True once the text is sent, or False if it couldn't be.
+        """
+        buffer = self._get_buffer(channel)
+        # two newlines between joined posts
+        added_length = len(text) + (2 if buffer.pending else 0)
+        if buffer.kind != "text" or buffer.length + added_length > MAX_MESSAGE_LENGTH:
+            await self._flush(buffer)
+            added_length = len(text)
+        buffer.kind = "text"
+        buffer.pending.append(text)
+        if callback:
+            buffer.callbacks.append(callback)
+        buffer.length += added_length
+        self._schedule_flush(buffer)
+
+    async def add_embed(self, channel: discord.TextChannel, embed: discord.Embed, *, callback=None):
+        """callback is called with True once the embed is sent, or False if it couldn't be."""
+        buffer = self._get_buffer(channel)
+        embed_length = len(embed)
+        if (
+            buffer.kind != "embed"
+            or len(buffer.pending) >= MAX_EMBEDS
+            or buffer.length + embed_length > MAX_EMBED_TOTAL_LENGTH
+        ):
+            await self._flush(buffer)
+        buffer.kind = "embed"
+        buffer.pending.append(embed)
+        if callback:
+            buffer.callbacks.append(callback)
+        buffer.length += embed_length
+        if len(buffer.pending) >= MAX_EMBEDS:
+            await self._flush(buffer)
+        else:
+            self._schedule_flush(buffer)
+
+    def _schedule_flush(self, buffer: _ChannelBuffer):
+        if buffer.flush_task is None or buffer.flush_task.done():
+            buffer.flush_task = asyncio.create_task(self._delayed_flush(buffer))
+
+    async def _delayed_flush(self, buffer: _ChannelBuffer):
+        await asyncio.sleep(self.flush_delay)
+        # posts added while this flush waits on the lock get a timer of their own
+        buffer.flush_task = None
+        await self._flush(buffer)
+
+    async def _flush(self, buffer: _ChannelBuffer):
+        """Send everything pending for the channel as one message."""
+        if not buffer.pending:
+            return
+        kind, pending, callbacks = buffer.kind, buffer.pending, buffer.callbacks
+        buffer.kind, buffer.pending, buffer.callbacks, buffer.length = None, [], [], 0
+        # the lock keeps messages in order when a timed flush and a full buffer flush overlap,
+        # and a retried message holds it so that later posts don't overtake it
+        async with buffer.lock:
+            sent = await self._send(buffer.channel, kind, pending)
+        for callback in callbacks:
+            try:
+                callback(sent)
+            except Exception:
+                log.error("Error in a feed post callback.", exc_info=True)
+
+    async def _send(self, channel: discord.TextChannel, kind: str, pending: list):
+        """Returns True if everything was sent."""
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            try:
+                if kind == "text":
+                    await channel.send("\n\n".join(pending))
+                else:
+                    await self._send_embeds(channel, pending)
+                return True
+            except discord.HTTPException as e:
+                if e.status < 500 or attempt == MAX_SEND_ATTEMPTS:
+                    log.error(
+                        f"Failed to send {len(pending)} feed post(s) in {channel.name} ({channel.id})", exc_info=True
+                    )
+                    return False
+                log.debug(f"Server error sending feed posts in {channel.name} ({channel.id}), trying again.")
+                await asyncio.sleep(2 ** attempt)
+
+    @staticmethod
+    async def _send_embeds(channel: discord.TextChannel, embeds: list):
+        if discord.version_info.major >= 2:
+            await channel.send(embeds=embeds)
+            return
+        # discord.py 1.x can only send one embed per message,
+        # the ones already sent are taken off so that a retry doesn't post them twice
+        while embeds:
+            await channel.send(embed=embeds[0])
+            del embeds[0]
+
+    async def flush_all(self):
+        """Send everything pending without waiting for the timers."""
+        for buffer in list(self._buffers.values()):
+            await self._flush(buffer)
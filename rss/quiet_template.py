@@ -6,26 +6,57 @@ class QuietTemplate(Template):
     """
     A subclass of string.Template that is less verbose on a missing key
     https://github.com/python/cpython/blob/919f0bc8c904d3aa13eedb2dd1fe9c6b0555a591/Lib/string.py#L123
+
+    The template is split into (literal text, tag name) pieces once,
+    so that filling it in again for every post doesn't run the regex again.
     """
 
+    def __init__(self, template):
+        super().__init__(template)
+        self._segments = None
+
+    def _get_segments(self):
+        if self._segments is not None:
+            return self._segments
+        segments = []
+        position = 0
+        for mo in self.pattern.finditer(self.template):
+            literal = self.template[position:mo.start()]
+            named = mo.group('named') or mo.group('braced')
+            if named is not None:
+                segments.append((literal, named))
+            elif mo.group('escaped') is not None:
+                segments.append((literal + self.delimiter, None))
+            elif mo.group('invalid') is not None:
+                segments.append((literal + mo.group(), None))
+            else:
+                raise ValueError('Unrecognized named group in pattern', self.pattern)
+            position = mo.end()
+        segments.append((self.template[position:], None))
+        self._segments = segments
+        return segments
+
+    def get_tag_names(self):
+        """Names of every $tag or ${tag} in the template, in order and without duplicates."""
+        tag_names = []
+        for _, named in self._get_segments():
+            if named is not None and named not in tag_names:
+                tag_names.append(named)
+        return tag_names
+
     def quiet_safe_substitute(self, mapping={}, /, **kws):
         if mapping is {}:
             mapping = kws
         elif kws:
             mapping = ChainMap(kws, mapping)
-        # Helper function for .sub()
-        def convert(mo):
-            named = mo.group('named') or mo.group('braced')
+        parts = []
+        for literal, named in self._get_segments():
+            parts.append(literal)
             if named is not None:
                 try:
-                    return str(mapping[named])
+                    parts.append(str(mapping[named]))
                 except KeyError:
-                    # return None instead of the tag name so that
+                    # leave out the tag name so that
                     # invalid tags are not present in the feed output
-                    return None
-            if mo.group('escaped') is not None:
-                return self.delimiter
-            if mo.group('invalid') is not None:
-                return mo.group()
-            raise ValueError('Unrecognized named group in pattern', self.pattern)
-        return self.pattern.sub(convert, self.template)
+                    pass
+        return "".join(parts)
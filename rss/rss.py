@@ -1,14 +1,18 @@
 import asyncio
 import aiohttp
 from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
+from concurrent.futures import ThreadPoolExecutor
 import copy
 import datetime
 import discord
 import feedparser
+import functools
+import hashlib
 import imghdr
 import io
 import logging
 import re
+import statistics
 import time
 import warnings
 from typing import Optional
@@ -16,11 +20,29 @@ from types import MappingProxyType, SimpleNamespace
 from urllib.parse import urlparse
 
 from redbot.core import checks, commands, Config
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.chat_formatting import bold, box, escape, humanize_list, pagify
 
+from .cache import TTLCache
+from .channel_cache import ChannelCache
 from .color import Color
+from .feed_store import ConfigFeedStore, SQLiteFeedStore
+from .fetch import (
+    IMAGE_CONTENT_TYPES,
+    IMAGE_SNIFF_SIZE,
+    ContentRejected,
+    read_head,
+    read_limited,
+    sniff_image_type,
+)
+from .metrics import FeedStats
+from .opml import OPMLError, build_opml, parse_opml
+from .post_buffer import PostBuffer
 from .quiet_template import QuietTemplate
 from .rss_feed import RssFeed
+from .scheduler import HostCircuitBreaker, HostLimiter, RateLimiter
+from .sharding import HEARTBEAT_INTERVAL, ShardCoordinator
+from .tag_mapping import LazyTagMapping
 from .tag_type import INTERNAL_TAGS, VALID_IMAGES, TagType
 
 log = logging.getLogger("red.aikaterna.rss")
@@ -30,7 +52,14 @@ IPV4_RE = re.compile("\\d{1,3}\\.\\d{1,3}\\.\\d{1,3}\\.\\d{1,3}")
 IPV6_RE = re.compile("([a-f0-9:]+:+)+[a-f0-9]+")
 
 
-__version__ = "1.8.3"
+__version__ = "1.11.0"
+
+OPML_MAX_SIZE = 1024 * 1024
+OPML_MAX_FEEDS = 500
+OPML_IMPORT_CONCURRENCY = 8
+
+# entry ids kept per feed in the seen-entry index
+SEEN_ENTRY_LIMIT = 200
 
 warnings.filterwarnings(
     "ignore",
@@ -54,25 +83,156 @@ class RSS(commands.Cog):
 
         self.config = Config.get_conf(self, 2761331001, force_registration=True)
         self.config.register_channel(feeds={})
-        self.config.register_global(use_published=["www.youtube.com"])
+        self.config.register_global(
+            use_published=["www.youtube.com"],
+            scheduler_workers=0,
+            scheduler_host_limit=2,
+            scheduler_rate_limit=10.0,
+            parse_workers=2,
+            parse_offload_size=50000,
+            adaptive_polling=False,
+            adaptive_min_interval=300,
+            adaptive_max_interval=21600,
+            max_content_size=10 * 1024 * 1024,
+            storage_engine="config",
+            sharding="off",
+        )
+
+        # where feed definitions and cursors are read and saved, Config unless the sqlite engine is turned on
+        self._store = ConfigFeedStore(self.config)
 
         self._post_queue = asyncio.PriorityQueue()
         self._post_queue_size = None
 
+        # fetch tasks shared by every channel subscribed to the same feed url during one sweep
+        # key is (url, etag, last_modified) and the value is an asyncio.Task
+        self._sweep_fetches = {}
+        self._sweep_subscribers = {}
+        self._sweep_started = time.monotonic()
+
+        # learned poll intervals in seconds and the next time each feed is due, keyed by (channel_id, feed_name)
+        self._poll_intervals = {}
+        self._feed_due = {}
+
+        self._feed_stats = FeedStats()
+
+        # compiled template and the tags it uses, keyed by (channel_id, feed_name)
+        self._templates = {}
+
+        # the last parsed feed per url and the tag mappings built from its entries, keyed by (url, entry id),
+        # so that rss listtags and rss force right after a check don't fetch and build everything again
+        self._recent_feeds = TTLCache(maxsize=128, ttl=300)
+        self._recent_entries = TTLCache(maxsize=1024, ttl=300)
+
+        # image type (or None for not an image) of recently checked embed image urls
+        self._image_types = TTLCache(maxsize=1024, ttl=3600)
+
+        # hosts that keep failing are skipped by the feed loop until a probe request gets through
+        self._host_circuits = HostCircuitBreaker()
+
+        # new posts are held for a moment so that several can go out in one message
+        self._post_buffer = PostBuffer()
+
+        # feedparser and bs4 work on documents over the offload size runs in this pool instead of the event loop
+        self._parse_workers = 2
+        self._parse_executor = ThreadPoolExecutor(max_workers=self._parse_workers, thread_name_prefix="rss_parse")
+        self._parse_offload_size = 50000
+
         self._read_feeds_loop = None
 
+        # channels the feed loop posts in, kept until a channel/role/guild event invalidates them
+        self._channels = ChannelCache(bot)
+
+        # splits feed polling between several bot processes sharing this Config, when sharding is turned on
+        self._shards = ShardCoordinator(self.config)
+        self._heartbeat_loop = None
+
         self._headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:83.0) Gecko/20100101 Firefox/83.0"}
 
+        # one long-lived connection pool for every request this cog makes, so that
+        # repeat polls to the same websites reuse dns lookups and open connections
+        connector = aiohttp.TCPConnector(limit=100, limit_per_host=6, ttl_dns_cache=300, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(
+            connector=connector, headers=self._headers, timeout=aiohttp.ClientTimeout(total=20)
+        )
+
     async def red_delete_data_for_user(self, **kwargs):
         """Nothing to delete"""
         return
 
-    def initialize(self):
+    async def initialize(self):
+        if await self.config.storage_engine() == "sqlite":
+            try:
+                self._store = await self._open_sqlite_store()
+            except Exception:
+                # the feeds saved in Config before the switch to sqlite are used instead
+                log.error("Couldn't open the RSS feed database, falling back to Config storage.", exc_info=True)
+        self._heartbeat_loop = self.bot.loop.create_task(self._shard_heartbeat())
         self._read_feeds_loop = self.bot.loop.create_task(self.read_feeds())
 
+    async def _shard_heartbeat(self):
+        """Lets the other bot processes know this one is still polling its share of the feeds."""
+        while True:
+            try:
+                if await self.config.sharding() == "hash":
+                    await self._shards.heartbeat()
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                log.error("Failed to save the RSS sharding heartbeat.", exc_info=True)
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _open_sqlite_store(self):
+        store = SQLiteFeedStore(cog_data_path(self) / "feeds.db")
+        await store.open()
+        return store
+
     def cog_unload(self):
         if self._read_feeds_loop:
             self._read_feeds_loop.cancel()
+        if self._heartbeat_loop:
+            self._heartbeat_loop.cancel()
+            self.bot.loop.create_task(self._shards.leave())
+        self.bot.loop.create_task(self._post_buffer.flush_all())
+        self.bot.loop.create_task(self._session.close())
+        self.bot.loop.create_task(self._store.close())
+        self._parse_executor.shutdown(wait=False)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self._channels.invalidate_channel(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        # permission overwrites are part of the channel
+        self._channels.invalidate_channel(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.permissions != after.permissions:
+            self._channels.invalidate_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self._channels.invalidate_guild(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if after.id == self.bot.user.id and before.roles != after.roles:
+            self._channels.invalidate_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self._channels.invalidate_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self._channels.invalidate_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        # the guild and its channels are new objects after an outage
+        self._channels.invalidate_guild(guild.id)
 
     def _add_content_images(self, bs4_soup: BeautifulSoup, rss_object: feedparser.util.FeedParserDict):
         """
@@ -90,6 +250,49 @@ class RSS(commands.Cog):
                     pass
         return rss_object
 
+    async def _adjust_poll_interval(
+        self,
+        channel: discord.TextChannel,
+        feed_name: str,
+        rss_feed: dict,
+        sorted_entries: Optional[list],
+        *,
+        found_new: bool,
+    ):
+        """
+        Helper for adaptive polling.
+        Learns how often a feed publishes and schedules its next check, returns the new interval in seconds,
+        or None when adaptive polling is off.
+
+        sorted_entries must be newest first.
+        A feed with new posts is checked at half of the median time between its latest posts,
+        a feed without anything new backs off by half of its current interval.
+        """
+        if not await self.config.adaptive_polling():
+            return None
+        min_interval = await self.config.adaptive_min_interval()
+        max_interval = await self.config.adaptive_max_interval()
+
+        key = (channel.id, feed_name)
+        interval = self._poll_intervals.get(key, None) or rss_feed.get("poll_interval", None) or min_interval
+
+        if found_new and sorted_entries:
+            entry_times = []
+            for entry in sorted_entries[:10]:
+                entry_time = await self._time_tag_validation(entry)
+                if entry_time:
+                    entry_times.append(entry_time)
+            entry_times.sort(reverse=True)
+            gaps = [newer - older for newer, older in zip(entry_times, entry_times[1:]) if newer > older]
+            interval = statistics.median(gaps) / 2 if gaps else min_interval
+        elif not found_new:
+            interval = interval * 1.5
+
+        interval = int(min(max(interval, min_interval), max_interval))
+        self._poll_intervals[key] = interval
+        self._feed_due[key] = time.monotonic() + interval
+        return interval
+
     async def _add_feed(self, ctx, feed_name: str, channel: discord.TextChannel, url: str):
         """Helper for rss add."""
         rss_exists = await self._check_feed_existing(ctx, feed_name, channel)
@@ -99,20 +302,8 @@ class RSS(commands.Cog):
                 await ctx.send("Couldn't fetch that feed: there were no feed objects found.")
                 return
 
-            # sort everything by time if a time value is present
-            if feedparser_obj.entries:
-                # this feed has posts
-                sorted_feed_by_post_time = await self._sort_by_post_time(feedparser_obj.entries)
-            else:
-                # this feed does not have posts, but it has a header with channel information
-                sorted_feed_by_post_time = [feedparser_obj.feed]
-
-            # add additional tags/images/clean html
-            feedparser_plus_obj = await self._add_to_feedparser_object(sorted_feed_by_post_time[0], url)
-            rss_object = await self._convert_feedparser_to_rssfeed(feed_name, feedparser_plus_obj, url)
-
-            async with self.config.channel(channel).feeds() as feed_data:
-                feed_data[feed_name] = rss_object.to_json()
+            rss_object = await self._build_new_feed(feed_name, url, feedparser_obj)
+            await self._store.set_feed(channel.id, feed_name, rss_object.to_json())
             msg = (
                 f"Feed `{feed_name}` added in channel: {channel.mention}\n"
                 f"List the template tags with `{ctx.prefix}rss listtags` "
@@ -123,6 +314,38 @@ class RSS(commands.Cog):
             await ctx.send(f"There is already an existing feed named {bold(feed_name)} in {channel.mention}.")
             return
 
+    async def _build_new_feed(self, feed_name: str, url: str, feedparser_obj: feedparser.util.FeedParserDict):
+        """Helper for rss add/import: the RssFeed to save for a newly fetched feed."""
+        # sort everything by time if a time value is present
+        if feedparser_obj.entries:
+            # this feed has posts
+            sorted_feed_by_post_time = await self._sort_by_post_time(feedparser_obj.entries)
+        else:
+            # this feed does not have posts, but it has a header with channel information
+            sorted_feed_by_post_time = [feedparser_obj.feed]
+
+        # add additional tags/images/clean html
+        feedparser_plus_obj = await self._add_to_feedparser_object(sorted_feed_by_post_time[0], url)
+        rss_object = await self._convert_feedparser_to_rssfeed(feed_name, feedparser_plus_obj, url)
+        rss_object.seen_ids = self._update_seen_index([], sorted_feed_by_post_time)
+        return rss_object
+
+    async def _import_feed(self, feed_name: str, url: str, semaphore: asyncio.Semaphore):
+        """Helper for rss import: returns (RssFeed, None) or (None, reason it can't be added)."""
+        if not self._is_url(url):
+            return None, "not a full url"
+        async with semaphore:
+            try:
+                feedparser_obj = await self._fetch_feedparser_object(url)
+                if feedparser_obj.entries is None:
+                    error_msg = feedparser_obj.error or "no feed content"
+                    # first line only, the bozo message continues with feedparser's own error
+                    return None, error_msg.split("\n")[0]
+                return await self._build_new_feed(feed_name, url, feedparser_obj), None
+            except Exception as e:
+                log.error(f"Failed to import feed at url:\n\t{url}", exc_info=True)
+                return None, f"unexpected error: {e}"
+
     def _add_generic_html_plaintext(self, bs4_soup: BeautifulSoup):
         """
         Bs4's .text attribute on a soup strips newlines and spaces
@@ -143,16 +366,30 @@ class RSS(commands.Cog):
 
     async def _append_bs4_tags(self, rss_object: feedparser.util.FeedParserDict, url: str):
         """Append bs4-discovered tags to an rss_feed/feedparser object."""
+        return await self._run_parse_job(self._get_entry_html_size(rss_object), self._build_bs4_tags, rss_object)
+
+    def _build_bs4_tags(self, rss_object: feedparser.util.FeedParserDict, only_tags: Optional[set] = None):
+        """
+        Helper for _append_bs4_tags and LazyTagMapping.
+        This is blocking and may run in the parse pool, so it must not touch the event loop.
+
+        only_tags limits the html/list tag processing to those source tags, None processes every tag.
+        """
+        # tags are added to a shallow copy so that a parsed feed shared by
+        # several channels in the same sweep is never modified
+        temp_rss_obect = rss_object
+        rss_object = copy.copy(rss_object)
         rss_object["is_special"] = []
         soup = None
         tags_list = []
 
-        temp_rss_obect = copy.deepcopy(rss_object)
         for tag_name, tag_content in temp_rss_obect.items():
             if tag_name in INTERNAL_TAGS:
                 continue
+            if only_tags is not None and tag_name not in only_tags:
+                continue
 
-            tag_content_check = await self._get_tag_content_type(tag_content)
+            tag_content_check = self._get_tag_content_type(tag_content)
 
             if tag_content_check == TagType.HTML:
                 # this is a tag that is only html content
@@ -182,7 +419,7 @@ class RSS(commands.Cog):
                 tags_content_counter = 0
 
                 for list_item in tag_content:
-                    list_item_check = await self._get_tag_content_type(list_item)
+                    list_item_check = self._get_tag_content_type(list_item)
 
                     # for common "links" format or when "content" is a list
                     list_html_content_counter = 0
@@ -190,7 +427,7 @@ class RSS(commands.Cog):
                         list_tags = ["value", "href"]
                         for tag in list_tags:
                             try:
-                                url_check = await self._valid_url(list_item[tag], feed_check=False)
+                                url_check = self._is_url(list_item[tag])
                                 if not url_check:
                                     # bs4 will cry if you try to give it a url to parse, so let's only
                                     # parse non-url content
@@ -279,7 +516,8 @@ class RSS(commands.Cog):
             except KeyError:
                 pass
 
-        if soup:
+        # content images come from the last html tag, which is only known when every tag was processed
+        if soup and only_tags is None:
             rss_object = self._add_content_images(soup, rss_object)
 
         # add special tag/special site formatter here if needed in the future
@@ -307,7 +545,7 @@ class RSS(commands.Cog):
 
     async def _check_feed_existing(self, ctx, feed_name: str, channel: discord.TextChannel):
         """Helper for rss functions."""
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             return False
         return True
@@ -317,9 +555,10 @@ class RSS(commands.Cog):
         rss_exists = await self._check_feed_existing(ctx, feed_name, channel)
 
         if rss_exists:
-            async with self.config.channel(channel).feeds() as rss_data:
-                rss_data.pop(feed_name, None)
-                return True
+            await self._store.remove_feed(channel.id, feed_name)
+            self._templates.pop((channel.id, feed_name), None)
+            await self._shards.release_feed(channel.id, feed_name)
+            return True
         return False
 
     async def _edit_template(self, ctx, feed_name: str, channel: discord.TextChannel, template: str):
@@ -327,11 +566,8 @@ class RSS(commands.Cog):
         rss_exists = await self._check_feed_existing(ctx, feed_name, channel)
 
         if rss_exists:
-            async with self.config.channel(channel).feeds.all() as feed_data:
-                if feed_name not in feed_data:
-                    feed_data[feed_name] = {}
-                feed_data[feed_name]["template"] = template
-                return True
+            self._templates.pop((channel.id, feed_name), None)
+            return await self._store.update_feed(channel.id, feed_name, {"template": template})
         return False
 
     @staticmethod
@@ -356,32 +592,85 @@ class RSS(commands.Cog):
 
         return website
 
-    async def _get_channel_object(self, channel_id: int):
-        """Helper for rss feed loop."""
-        channel = self.bot.get_channel(channel_id)
-        if not channel:
-            try:
-                channel = await self.bot.fetch_channel(channel_id)
-            except (discord.errors.Forbidden, discord.errors.NotFound):
-                return None
-        if channel and channel.permissions_for(channel.guild.me).send_messages:
-            return channel
-        return None
-
-    async def _get_feed_names(self, channel: discord.TextChannel):
+    async def _get_feed_names(self, channel: discord.TextChannel, *, show_colors: bool = False):
         """Helper for rss list/listall."""
         feed_list = []
         space = "\N{SPACE}"
-        all_feeds = await self.config.channel(channel).feeds.all()
+        all_feeds = await self._store.get_channel_feeds(channel.id)
         if not all_feeds:
             return ["None."]
         longest_name_len = len(max(list(all_feeds.keys()), key=len))
-        for name, data in all_feeds.items():
+        if show_colors:
+            hex_codes = [data.get("embed_color", None) for data in all_feeds.values()]
+            color_names = await Color()._hex_to_css3_names(hex_codes)
+        else:
+            color_names = [None] * len(all_feeds)
+        for (name, data), color_name in zip(all_feeds.items(), color_names):
             extra_spacing = longest_name_len - len(name)
-            feed_list.append(f"{name}{space * extra_spacing}  {data['url']}")
+            color = f"  ({color_name})" if color_name else ""
+            feed_list.append(f"{name}{space * extra_spacing}  {data['url']}{color}")
         return feed_list
 
-    async def _get_tag_content_type(self, tag_content):
+    @staticmethod
+    def _get_entry_id(entry: feedparser.util.FeedParserDict):
+        """
+        Helper for the seen-entry index: a short hash of the entry's guid, or link or title if there is no guid,
+        or its summary or content if it has none of those.
+        The entry time is left out on purpose so that an entry with a changed updated_parsed time isn't posted again.
+        """
+        entry_key = entry.get("id", None) or entry.get("link", None) or entry.get("title", None)
+        if not entry_key:
+            content = entry.get("content", None)
+            entry_key = entry.get("summary", None) or (content[0].get("value", None) if content else None)
+        if not entry_key:
+            return None
+        return hashlib.blake2b(str(entry_key).encode("utf-8"), digest_size=8).hexdigest()
+
+    def _get_lazy_tags(self, entry: feedparser.util.FeedParserDict, url: Optional[str] = None):
+        """
+        Helper for get_current_feed: a template tag mapping that only builds the tags that are used.
+        With a url, the mapping is shared by everything that uses the same parsed entry in the next few minutes,
+        like other channels with the same feed or rss listtags, so the tags are only built once.
+        """
+        entry_id = self._get_entry_id(entry) if url else None
+        if entry_id is None:
+            return LazyTagMapping(entry, self._build_bs4_tags)
+        key = (url, entry_id)
+        lazy_tags = self._recent_entries.get(key)
+        # an entry that was parsed again might have changed, so only the same parsed object is reused
+        if lazy_tags is None or lazy_tags.entry is not entry:
+            lazy_tags = LazyTagMapping(entry, self._build_bs4_tags)
+            self._recent_entries.set(key, lazy_tags)
+        return lazy_tags
+
+    def _get_compiled_template(self, channel_id: int, feed_name: str, template: str):
+        """Helper for get_current_feed: the feed's QuietTemplate and the tag names in it."""
+        key = (channel_id, feed_name)
+        compiled = self._templates.get(key, None)
+        if compiled is None or compiled[0].template != template:
+            to_fill = QuietTemplate(template)
+            compiled = self._templates[key] = (to_fill, to_fill.get_tag_names())
+        return compiled
+
+    async def _prepare_lazy_tags(self, lazy_tags: LazyTagMapping, tag_names: list):
+        """Helper for get_current_feed: build the tags that will be used up front, in the parse pool if needed."""
+        sources = lazy_tags.sources_for(tag_names)
+        if not lazy_tags.is_built(sources):
+            await self._run_parse_job(self._get_entry_html_size(lazy_tags.entry), lazy_tags.build, sources)
+
+    @staticmethod
+    def _get_entry_html_size(entry: feedparser.util.FeedParserDict):
+        """Helper for _append_bs4_tags: a rough size of the html content that bs4 will need to parse."""
+        size = len(str(entry.get("summary", "")))
+        for content in entry.get("content", []):
+            try:
+                size += len(content["value"])
+            except (KeyError, TypeError):
+                pass
+        return size
+
+    @staticmethod
+    def _get_tag_content_type(tag_content):
         """
         Tag content type can be:
             str, list, dict (FeedParserDict), bool, datetime.datetime object or time.struct_time
@@ -401,54 +690,188 @@ class RSS(commands.Cog):
         else:
             return TagType(1)
 
-    async def _get_url_content(self, url):
-        """Helper for rss add/_valid_url."""
+    async def _get_unseen_entries(
+        self,
+        channel: discord.TextChannel,
+        name: str,
+        rss_feed: dict,
+        feedparser_obj: feedparser.util.FeedParserDict,
+        validators: Optional[dict],
+    ):
+        """
+        Helper for get_current_feed.
+        Returns the entries that aren't in the feed's seen-entry index, newest first, and saves the updated index.
+        """
+        if feedparser_obj.entries:
+            entries = feedparser_obj.entries
+        else:
+            # this feed does not have posts, but it has a header with channel information
+            entries = [feedparser_obj.feed]
+
+        seen_ids = rss_feed["seen_ids"]
+        seen = set(seen_ids)
+        unseen_entries = []
+        for entry in entries:
+            entry_id = self._get_entry_id(entry)
+            if not entry_id:
+                log.debug(f"Skipping an entry with no id, link, title or content in feed {name} on cid {channel.id}")
+            elif entry_id not in seen:
+                unseen_entries.append(entry)
+
+        # only the new entries need to be put in posting order
+        new_entries = await self._sort_by_post_time(unseen_entries) if unseen_entries else []
+        if seen_ids and len(new_entries) == len(entries) and len(entries) > 1:
+            # nothing in the whole feed matched the index, so let's only post 1 instead of every single post
+            log.debug(f"Couldn't match anything for feed {name} on cid {channel.id}, only posting 1 post")
+            new_entries = new_entries[:1]
+
+        # the cadence is learned from the latest posts, so it needs the whole feed in post order
+        sorted_entries = None
+        if new_entries and await self.config.adaptive_polling():
+            sorted_entries = await self._sort_by_post_time(entries)
+        poll_interval = await self._adjust_poll_interval(
+            channel, name, rss_feed, sorted_entries, found_new=bool(new_entries)
+        )
+        feed_updates = dict(validators or {})
+        if poll_interval is not None:
+            feed_updates["poll_interval"] = poll_interval
+        new_seen_ids = self._update_seen_index(seen_ids, entries)
+        if new_seen_ids != seen_ids:
+            feed_updates["seen_ids"] = new_seen_ids
+
+        if new_entries:
+            log.debug(f"{len(new_entries)} new entries found via the seen-entry index for feed {name} on cid {channel.id}")
+            newest_entry = new_entries[0]
+            await self._update_last_scraped(
+                channel,
+                name,
+                newest_entry.get("title", ""),
+                newest_entry.get("link", ""),
+                await self._time_tag_validation(newest_entry),
+                **feed_updates,
+            )
+        elif any(rss_feed.get(key, None) != value for key, value in feed_updates.items()):
+            await self._update_last_scraped(
+                channel,
+                name,
+                rss_feed["last_title"],
+                rss_feed.get("last_link", None),
+                rss_feed.get("last_time", None),
+                **feed_updates,
+            )
+
+        return new_entries
+
+    def _log_fetch_failure(self, url: str, msg: str, *, exc_info: bool = True):
+        """
+        Helper for _get_url_content: counts the failure against the url's host.
+        Only a host's first failure in a row is logged in full, then one warning when its circuit opens.
+        """
+        failures, opened = self._host_circuits.record_failure(url, msg.split(":")[0])
+        if failures == 1:
+            log.error(msg, exc_info=exc_info)
+        elif opened:
+            host = self._host_circuits.get_host(url)
+            backoff = int(self._host_circuits.get_backoff(url))
+            log.warning(f"{host} has failed {failures} times in a row, skipping its feeds for {backoff} seconds.")
+        else:
+            log.debug(msg, exc_info=exc_info)
+
+    async def _get_url_content(self, url, validators: Optional[dict] = None):
+        """
+        Helper for rss add/_valid_url.
+
+        If a validators dict is passed in, its `etag` and `last_modified` values are sent as a conditional request
+        and the dict is updated with the values from the response.
+        A 304 Not Modified response returns (None, None).
+        """
+        headers = {}
+        if validators:
+            if validators.get("etag", None):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified", None):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        fetch_start = time.monotonic()
+        status = None
+        html = None
         try:
-            timeout = aiohttp.ClientTimeout(total=20)
-            async with aiohttp.ClientSession(headers=self._headers, timeout=timeout) as session:
-                async with session.get(url) as resp:
-                    html = await resp.read()
+            async with self._session.get(url, headers=headers) as resp:
+                status = resp.status
+                if resp.status >= 500:
+                    self._log_fetch_failure(url, f"server error {resp.status} at feed url:\n\t{url}", exc_info=False)
+                    # the body is an error page, not the feed
+                    return None, f"The website returned a server error ({resp.status})."
+                self._host_circuits.record_success(url)
+                if resp.status == 304:
+                    return None, None
+                html = await read_limited(resp, await self.config.max_content_size())
+                if validators is not None:
+                    validators["etag"] = resp.headers.get("ETag", None)
+                    validators["last_modified"] = resp.headers.get("Last-Modified", None)
             return html, None
         except aiohttp.client_exceptions.ClientConnectorError:
             friendly_msg = "There was an OSError or the connection failed."
             msg = f"aiohttp failure accessing feed at url:\n\t{url}"
-            log.error(msg, exc_info=True)
+            self._log_fetch_failure(url, msg)
             return None, friendly_msg
         except aiohttp.client_exceptions.ClientPayloadError as e:
             friendly_msg = "The website closed the connection prematurely or the response was malformed.\n"
             friendly_msg += f"The error returned was: `{str(e)}`\n"
             friendly_msg += "For more technical information, check your bot's console or logs."
             msg = f"content error while reading feed at url:\n\t{url}"
-            log.error(msg, exc_info=True)
+            self._log_fetch_failure(url, msg)
             return None, friendly_msg
         except asyncio.exceptions.TimeoutError:
             friendly_msg = "The bot timed out while trying to access that content."
             msg = f"asyncio timeout while accessing feed at url:\n\t{url}"
-            log.error(msg, exc_info=True)
+            self._log_fetch_failure(url, msg)
             return None, friendly_msg
         except aiohttp.client_exceptions.ServerDisconnectedError:
             friendly_msg = "The target server disconnected early without a response."
             msg = f"server disconnected while accessing feed at url:\n\t{url}"
-            log.error(msg, exc_info=True)
+            self._log_fetch_failure(url, msg)
+            return None, friendly_msg
+        except ContentRejected as e:
+            friendly_msg = str(e)
+            log.warning(f"Content rejected while accessing feed at url:\n\t{url}\n\t{friendly_msg}")
             return None, friendly_msg
         except Exception:
             friendly_msg = "There was an unexpected error. Check your console for more information."
             msg = f"General failure accessing feed at url:\n\t{url}"
             log.error(msg, exc_info=True)
             return None, friendly_msg
+        finally:
+            self._feed_stats.record_fetch(
+                url,
+                seconds=time.monotonic() - fetch_start,
+                size=len(html) if html else 0,
+                status=status,
+                error=(html is None and status != 304) or (status is not None and status >= 400),
+            )
 
-    async def _fetch_feedparser_object(self, url: str):
-        """Get a full feedparser object from a url: channel header + items."""
-        html, error_msg = await self._get_url_content(url)
+    async def _fetch_feedparser_object(self, url: str, validators: Optional[dict] = None):
+        """
+        Get a full feedparser object from a url: channel header + items.
+
+        validators is passed through to _get_url_content for a conditional request.
+        """
+        html, error_msg = await self._get_url_content(url, validators)
+        if html is None and error_msg is None:
+            # 304 Not Modified, skip parsing entirely
+            error_msg = f"Feed not modified since the last check: {url}"
+            return SimpleNamespace(entries=None, error=error_msg, url=url, not_modified=True)
         if not html:
             return SimpleNamespace(entries=None, error=error_msg, url=url)
 
-        feedparser_obj = feedparser.parse(html)
+        parse_start = time.monotonic()
+        feedparser_obj = await self._run_parse_job(len(html), feedparser.parse, html)
+        self._feed_stats.record_parse(url, seconds=time.monotonic() - parse_start, error=bool(feedparser_obj.bozo))
         if feedparser_obj.bozo:
             error_msg = f"Bozo feed: feedparser is unable to parse the response from {url}.\n"
             error_msg += f"Feedparser error message: `{feedparser_obj.bozo_exception}`"
             return SimpleNamespace(entries=None, error=error_msg, url=url)
 
+        self._recent_feeds.set(url, feedparser_obj)
         return feedparser_obj
 
     async def _add_to_feedparser_object(self, feedparser_obj: feedparser.util.FeedParserDict, url: str):
@@ -495,6 +918,26 @@ class RSS(commands.Cog):
 
         return rss_object
 
+    async def _load_parse_settings(self):
+        """Helper for the parse pool: apply the saved worker count and offload size."""
+        parse_workers = await self.config.parse_workers()
+        if parse_workers != self._parse_workers:
+            self._parse_workers = parse_workers
+            old_executor = self._parse_executor
+            self._parse_executor = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix="rss_parse")
+            # anything already running in the old pool is left to finish
+            old_executor.shutdown(wait=False)
+        self._parse_offload_size = await self.config.parse_offload_size()
+
+    async def _run_parse_job(self, size: int, func, *args):
+        """
+        Run blocking feedparser/bs4 work.
+        Documents smaller than the offload size are handled inline, anything larger always goes to the parse pool.
+        """
+        if size < self._parse_offload_size:
+            return func(*args)
+        return await self.bot.loop.run_in_executor(self._parse_executor, functools.partial(func, *args))
+
     async def _sort_by_post_time(self, feedparser_obj: feedparser.util.FeedParserDict):
         base_url = urlparse(feedparser_obj[0].get("link")).netloc
         use_published_parsed_override = await self.config.use_published()
@@ -538,6 +981,57 @@ class RSS(commands.Cog):
             return int(entry_time)
         return None
 
+    async def _fetch_feed_for_sweep(
+        self,
+        url: str,
+        validators: dict,
+        host_limiter: Optional[HostLimiter] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Helper for the feed loop.
+        Fetches and parses a feed url once per sweep, no matter how many channels are subscribed to it.
+        Returns the feedparser object and the cache validators from the response.
+        """
+        key = (url, validators["etag"], validators["last_modified"])
+        fetch_task = self._sweep_fetches.get(key, None)
+        if fetch_task is None:
+
+            async def fetch():
+                new_validators = dict(validators)
+                if not self._host_circuits.allow(url):
+                    host = self._host_circuits.get_host(url)
+                    error = f"Skipped, {host} has been failing. Check `rss scheduler circuits`."
+                    return SimpleNamespace(entries=None, error=error, url=url), new_validators
+                if host_limiter:
+                    async with host_limiter(url):
+                        if rate_limiter:
+                            await rate_limiter.wait()
+                        feedparser_obj = await self._fetch_feedparser_object(url, new_validators)
+                else:
+                    feedparser_obj = await self._fetch_feedparser_object(url, new_validators)
+                return feedparser_obj, new_validators
+
+            fetch_task = self._sweep_fetches[key] = asyncio.ensure_future(fetch())
+
+        try:
+            # shielded so that one cancelled subscriber doesn't cancel the fetch for the others
+            feedparser_obj, new_validators = await asyncio.shield(fetch_task)
+        finally:
+            # drop the parsed feed once the last subscriber in this sweep has it
+            remaining = self._sweep_subscribers.get(key, 1) - 1
+            if remaining > 0:
+                self._sweep_subscribers[key] = remaining
+            else:
+                self._sweep_subscribers.pop(key, None)
+                self._sweep_fetches.pop(key, None)
+        return feedparser_obj, dict(new_validators)
+
+    @staticmethod
+    def _get_feed_validators(rss_feed: dict):
+        """Helper for conditional feed requests: the cache validators saved from the last full response."""
+        return {"etag": rss_feed.get("etag", None), "last_modified": rss_feed.get("last_modified", None)}
+
     @staticmethod
     async def _title_case(phrase: str):
         exceptions = ["a", "and", "in", "of", "or", "on", "the"]
@@ -553,33 +1047,62 @@ class RSS(commands.Cog):
         current_feed_title: str,
         current_feed_link: str,
         current_feed_time: int,
+        **feed_updates,
     ):
-        """Updates last title and last link seen for comparison on next feed pull."""
-        async with self.config.channel(channel).feeds() as feed_data:
-            try:
-                feed_data[feed_name]["last_title"] = current_feed_title
-                feed_data[feed_name]["last_link"] = current_feed_link
-                feed_data[feed_name]["last_time"] = current_feed_time
-            except KeyError:
-                # the feed was deleted during a _get_current_feed execution
-                pass
+        """
+        Updates last title and last link seen for comparison on next feed pull.
 
-    async def _valid_url(self, url: str, feed_check=True):
-        """Helper for rss add."""
+        feed_updates is any other feed data to save at the same time, like cache validators or the seen-entry index.
+        """
+        # returns False if the feed was deleted during a _get_current_feed execution
+        await self._store.update_feed(
+            channel.id,
+            feed_name,
+            dict(
+                feed_updates,
+                last_title=current_feed_title,
+                last_link=current_feed_link,
+                last_time=current_feed_time,
+            ),
+        )
+
+    @staticmethod
+    def _is_url(url: str):
+        """Helper for _valid_url and bs4 tags: check for a full url without fetching it."""
         try:
             result = urlparse(url)
         except Exception as e:
             log.exception(e, exc_info=e)
             return False
+        return all([result.scheme, result.netloc, result.path])
 
-        if all([result.scheme, result.netloc, result.path]):
+    def _update_seen_index(self, seen_ids: list, entries: list):
+        """
+        Helper for the seen-entry index.
+        Entries still in the feed are moved to the newest end of the index and the oldest ids are dropped past the limit.
+        """
+        current_ids = []
+        current = set()
+        for entry in entries:
+            entry_id = self._get_entry_id(entry)
+            if entry_id and entry_id not in current:
+                current.add(entry_id)
+                current_ids.append(entry_id)
+        seen_ids = [entry_id for entry_id in seen_ids if entry_id not in current] + current_ids
+        # never drop an id that is still in the feed, or that entry would be posted again
+        limit = max(SEEN_ENTRY_LIMIT, len(current_ids))
+        return seen_ids[-limit:]
+
+    async def _valid_url(self, url: str, feed_check=True):
+        """Helper for rss add."""
+        if self._is_url(url):
             if feed_check:
                 text, error_msg = await self._get_url_content(url)
                 if not text:
                     raise NoFeedContent(error_msg)
                     return False
 
-                rss = feedparser.parse(text)
+                rss = await self._run_parse_job(len(text), feedparser.parse, text)
                 if rss.bozo:
                     error_message = rss.feed.get("summary", str(rss))[:1500]
                     error_message = re.sub(IPV4_RE, "[REDACTED IP ADDRESS]", error_message)
@@ -597,23 +1120,52 @@ class RSS(commands.Cog):
             return False
 
     async def _validate_image(self, url: str):
-        """Helper for _get_current_feed_embed."""
+        """
+        Helper for _get_current_feed_embed.
+        Results are cached per url, so a feed logo that is on every post is only checked once an hour.
+        """
+        if url in self._image_types:
+            return self._image_types.get(url)
         try:
-            timeout = aiohttp.ClientTimeout(total=20)
-            async with aiohttp.ClientSession(headers=self._headers, timeout=timeout) as session:
-                async with session.get(url) as resp:
-                    image = await resp.read()
-            img = io.BytesIO(image)
-            image_test = imghdr.what(img)
-            return image_test
-        except aiohttp.client_exceptions.InvalidURL:
-            return None
+            image_type = await self._check_image_type(url)
+        except (aiohttp.client_exceptions.InvalidURL, ContentRejected):
+            image_type = None
         except asyncio.exceptions.TimeoutError:
             log.error(f"asyncio timeout while accessing image at url:\n\t{url}", exc_info=True)
             return None
         except Exception:
             log.error(f"Failure accessing image in embed feed at url:\n\t{url}", exc_info=True)
             return None
+        # timeouts and unexpected errors aren't cached so that the url is tried again on the next post
+        self._image_types.set(url, image_type)
+        return image_type
+
+    async def _check_image_type(self, url: str):
+        """
+        Helper for _validate_image, from the cheapest check to the most expensive:
+        the Content-Type of a HEAD request, then the magic bytes from the start of the file,
+        then a full download for imghdr.
+        """
+        async with self._session.head(url, allow_redirects=True) as resp:
+            if resp.status < 400:
+                if resp.content_type in IMAGE_CONTENT_TYPES:
+                    return IMAGE_CONTENT_TYPES[resp.content_type]
+                if resp.content_type.startswith("text/"):
+                    return None
+            elif resp.status in [404, 410]:
+                return None
+
+        # some servers don't answer HEAD requests or don't send a useful Content-Type
+        async with self._session.get(url, headers={"Range": f"bytes=0-{IMAGE_SNIFF_SIZE - 1}"}) as resp:
+            if resp.status >= 400:
+                return None
+            image_type = sniff_image_type(await read_head(resp, IMAGE_SNIFF_SIZE))
+        if image_type:
+            return image_type
+
+        async with self._session.get(url) as resp:
+            image = await read_limited(resp, await self.config.max_content_size(), allowed_types=["image/"])
+        return imghdr.what(io.BytesIO(image))
 
     @commands.guild_only()
     @commands.group()
@@ -669,7 +1221,7 @@ class RSS(commands.Cog):
         or a [CSS3 color name](https://www.w3.org/TR/2018/REC-css-color-3-20180619/#svg-color).
         """
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
@@ -683,8 +1235,7 @@ class RSS(commands.Cog):
             )
 
         if not color:
-            async with self.config.channel(channel).feeds() as feed_data:
-                feed_data[feed_name]["embed_color"] = None
+            await self._store.update_feed(channel.id, feed_name, {"embed_color": None})
             await ctx.send(
                 f"{embed_state_message}The color for {bold(feed_name)} has been reset. "
                 "Use this command with a color argument to set a color for this feed."
@@ -709,9 +1260,8 @@ class RSS(commands.Cog):
         if hex_code == "0xFFFFFF":
             hex_code = "0xFFFFFE"
 
-        async with self.config.channel(channel).feeds() as feed_data:
-            # data is always a 0xFFFFFF style value
-            feed_data[feed_name]["embed_color"] = hex_code
+        # data is always a 0xFFFFFF style value
+        await self._store.update_feed(channel.id, feed_name, {"embed_color": hex_code})
 
         await ctx.send(f"Embed color for {bold(feed_name)} set to {user_facing_hex} ({color_name}).")
 
@@ -726,7 +1276,7 @@ class RSS(commands.Cog):
         Use this command with no image_tag_name to clear the embed image.
         """
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
@@ -756,8 +1306,7 @@ class RSS(commands.Cog):
                 await ctx.send(msg)
                 return
 
-        async with self.config.channel(channel).feeds() as feed_data:
-            feed_data[feed_name]["embed_image"] = image_tag_name
+        await self._store.update_feed(channel.id, feed_name, {"embed_image": image_tag_name})
 
         if image_tag_name:
             await ctx.send(f"{embed_state_message}Embed image set to the ${image_tag_name} tag.")
@@ -777,7 +1326,7 @@ class RSS(commands.Cog):
         Use this command with no thumbnail_tag_name to clear the embed thumbnail.
         """
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
@@ -807,8 +1356,7 @@ class RSS(commands.Cog):
                 await ctx.send(msg)
                 return
 
-        async with self.config.channel(channel).feeds() as feed_data:
-            feed_data[feed_name]["embed_thumbnail"] = thumbnail_tag_name
+        await self._store.update_feed(channel.id, feed_name, {"embed_thumbnail": thumbnail_tag_name})
 
         if thumbnail_tag_name:
             await ctx.send(f"{embed_state_message}Embed thumbnail set to the ${thumbnail_tag_name} tag.")
@@ -828,7 +1376,7 @@ class RSS(commands.Cog):
         toggle is set.
         """
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
@@ -836,11 +1384,30 @@ class RSS(commands.Cog):
         embed_toggle = rss_feed["embed"]
         toggle_text = "disabled" if embed_toggle else "enabled"
 
-        async with self.config.channel(channel).feeds() as feed_data:
-            feed_data[feed_name]["embed"] = not embed_toggle
+        await self._store.update_feed(channel.id, feed_name, {"embed": not embed_toggle})
 
         await ctx.send(f"Embeds for {bold(feed_name)} are {toggle_text}.")
 
+    @rss.command(name="export")
+    async def _rss_export(self, ctx, channel: Optional[discord.TextChannel] = None):
+        """
+        Export the feeds in this channel or a specific channel as an OPML file.
+
+        OPML files can be imported into most feed readers, or into another channel with `[p]rss import`.
+        """
+        channel = channel or ctx.channel
+        channel_permission_check = await self._check_channel_permissions(ctx, channel)
+        if not channel_permission_check:
+            return
+
+        all_feeds = await self._store.get_channel_feeds(channel.id)
+        if not all_feeds:
+            await ctx.send(f"There are no feeds in {channel.mention}.")
+            return
+        data = build_opml(f"#{channel.name} feeds", [(name, feed["url"]) for name, feed in all_feeds.items()])
+        opml_file = discord.File(io.BytesIO(data), filename=f"{channel.name}_feeds.opml")
+        await ctx.send(f"{len(all_feeds)} feeds from {channel.mention}.", file=opml_file)
+
     @rss.command(name="find")
     async def _rss_find(self, ctx, website_url: str):
         """
@@ -849,31 +1416,32 @@ class RSS(commands.Cog):
         The site must have identified their feed in the html of the page based on RSS feed type standards.
         """
         async with ctx.typing():
-            timeout = aiohttp.ClientTimeout(total=20)
-            async with aiohttp.ClientSession(headers=self._headers, timeout=timeout) as session:
-                try:
-                    async with session.get(website_url) as response:
-                        soup = BeautifulSoup(await response.text(errors="replace"), "html.parser")
-                except (aiohttp.client_exceptions.ClientConnectorError, aiohttp.client_exceptions.ClientPayloadError):
-                    await ctx.send("I can't reach that website.")
-                    return
-                except aiohttp.client_exceptions.InvalidURL:
-                    await ctx.send(
-                        "That seems to be an invalid URL. Use a full website URL like `https://www.site.com/`."
-                    )
-                    return
-                except aiohttp.client_exceptions.ServerDisconnectedError:
-                    await ctx.send("The server disconnected early without a response.")
-                    return
-                except asyncio.exceptions.TimeoutError:
-                    await ctx.send("The site didn't respond in time or there was no response.")
-                    return
-                except Exception as e:
-                    msg = "There was an issue trying to find a feed in that site. "
-                    msg += "Please check your console for more information."
-                    log.exception(e, exc_info=e)
-                    await ctx.send(msg)
-                    return
+            try:
+                async with self._session.get(website_url) as response:
+                    html = await read_limited(response, await self.config.max_content_size())
+                    text = html.decode(response.charset or "utf-8", errors="replace")
+                soup = await self._run_parse_job(len(text), BeautifulSoup, text, "html.parser")
+            except (aiohttp.client_exceptions.ClientConnectorError, aiohttp.client_exceptions.ClientPayloadError):
+                await ctx.send("I can't reach that website.")
+                return
+            except aiohttp.client_exceptions.InvalidURL:
+                await ctx.send("That seems to be an invalid URL. Use a full website URL like `https://www.site.com/`.")
+                return
+            except aiohttp.client_exceptions.ServerDisconnectedError:
+                await ctx.send("The server disconnected early without a response.")
+                return
+            except asyncio.exceptions.TimeoutError:
+                await ctx.send("The site didn't respond in time or there was no response.")
+                return
+            except ContentRejected as e:
+                await ctx.send(str(e))
+                return
+            except Exception as e:
+                msg = "There was an issue trying to find a feed in that site. "
+                msg += "Please check your console for more information."
+                log.exception(e, exc_info=e)
+                await ctx.send(msg)
+                return
 
         if "403 Forbidden" in soup.get_text():
             await ctx.send("I received a '403 Forbidden' message while trying to reach that site.")
@@ -917,20 +1485,85 @@ class RSS(commands.Cog):
         if not channel_permission_check:
             return
 
-        feeds = await self.config.all_channels()
-        try:
-            feeds[channel.id]
-        except KeyError:
+        feeds = await self._store.get_channel_feeds(channel.id)
+        if not feeds:
             await ctx.send("There are no feeds in this channel.")
             return
 
-        if feed_name not in feeds[channel.id]["feeds"]:
+        if feed_name not in feeds:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
 
-        rss_feed = feeds[channel.id]["feeds"][feed_name]
+        rss_feed = feeds[feed_name]
         await self.get_current_feed(channel, feed_name, rss_feed, force=True)
 
+    @rss.command(name="import")
+    async def _rss_import(self, ctx, channel: Optional[discord.TextChannel] = None):
+        """
+        Add every feed in an attached OPML file to this channel or a specific channel.
+
+        Most feed readers can export an OPML file of their subscriptions. Feed names are taken from each
+        outline's title, and feeds whose name is already used in the channel are skipped.
+        """
+        channel = channel or ctx.channel
+        channel_permission_check = await self._check_channel_permissions(ctx, channel)
+        if not channel_permission_check:
+            return
+        if not ctx.message.attachments:
+            await ctx.send("Attach an OPML file to the command message.")
+            return
+        attachment = ctx.message.attachments[0]
+        if attachment.size > OPML_MAX_SIZE:
+            await ctx.send(f"That file is too large, OPML files can be up to {OPML_MAX_SIZE // 1024} KB.")
+            return
+
+        try:
+            feeds = parse_opml(await attachment.read())
+        except OPMLError as e:
+            await ctx.send(str(e))
+            return
+        if not feeds:
+            await ctx.send("There are no feeds in that file.")
+            return
+        if len(feeds) > OPML_MAX_FEEDS:
+            await ctx.send(f"That file has {len(feeds)} feeds, up to {OPML_MAX_FEEDS} can be imported at once.")
+            return
+
+        existing_feeds = await self._store.get_channel_feeds(channel.id)
+        failures = []
+        to_check = {}
+        for feed_name, url in feeds:
+            if feed_name in existing_feeds or feed_name in to_check:
+                failures.append((feed_name, url, "a feed with this name already exists"))
+            else:
+                to_check[feed_name] = url
+
+        async with ctx.typing():
+            # every feed is checked at once through the shared session, a few at a time
+            semaphore = asyncio.Semaphore(OPML_IMPORT_CONCURRENCY)
+            results = await asyncio.gather(
+                *(self._import_feed(feed_name, url, semaphore) for feed_name, url in to_check.items())
+            )
+            new_feeds = {}
+            for (feed_name, url), (rss_object, error_msg) in zip(to_check.items(), results):
+                if rss_object:
+                    new_feeds[feed_name] = rss_object.to_json()
+                else:
+                    failures.append((feed_name, url, error_msg))
+            if new_feeds:
+                await self._store.set_feeds(channel.id, new_feeds)
+
+        msg = f"Imported {len(new_feeds)} of {len(feeds)} feeds into {channel.mention}."
+        if new_feeds:
+            msg += f" List the template tags with `{ctx.prefix}rss listtags`."
+        await ctx.send(msg)
+        if failures:
+            failure_msg = "[ Feeds That Were Not Imported ]\n\n"
+            for feed_name, url, error_msg in failures:
+                failure_msg += f"{feed_name}  {url}\n\t{error_msg}\n"
+            for page in pagify(failure_msg, delims=["\n"], page_length=1800):
+                await ctx.send(box(page, lang="ini"))
+
     @rss.command(name="limit")
     async def _rss_limit(
         self, ctx, feed_name: str, channel: Optional[discord.TextChannel] = None, character_limit: int = None
@@ -962,13 +1595,12 @@ class RSS(commands.Cog):
             character_limit = 20
 
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
 
-        async with self.config.channel(channel).feeds() as feed_data:
-            feed_data[feed_name]["limit"] = character_limit
+        await self._store.update_feed(channel.id, feed_name, {"limit": character_limit})
 
         characters = f"approximately {character_limit}" if character_limit > 0 else "an unlimited amount of"
         await ctx.send(f"{extra_msg}Character limit for {bold(feed_name)} is now {characters} characters.")
@@ -993,13 +1625,13 @@ class RSS(commands.Cog):
     @rss.command(name="listall")
     async def _rss_listall(self, ctx):
         """List all saved feeds for this server."""
-        all_channels = await self.config.all_channels()
+        all_channel_ids = await self._store.get_channel_ids()
         all_guild_channels = [x.id for x in ctx.guild.channels]
         msg = ""
-        for channel_id, data in all_channels.items():
+        for channel_id in all_channel_ids:
             if channel_id in all_guild_channels:
                 channel_obj = ctx.guild.get_channel(channel_id)
-                feeds = await self._get_feed_names(channel_obj)
+                feeds = await self._get_feed_names(channel_obj, show_colors=True)
                 if not feeds:
                     continue
                 if feeds == ["None."]:
@@ -1019,7 +1651,7 @@ class RSS(commands.Cog):
         if not channel_permission_check:
             return
 
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
 
         if not rss_feed:
             await ctx.send("No feed with that name in this channel.")
@@ -1031,24 +1663,28 @@ class RSS(commands.Cog):
     async def _rss_list_tags_helper(self, ctx, rss_feed: dict, feed_name: str):
         """Helper function for rss listtags."""
         msg = f"[ Available Tags for {feed_name} ]\n\n\t"
-        feedparser_obj = await self._fetch_feedparser_object(rss_feed["url"])
+        url = rss_feed["url"]
+        feedparser_obj = self._recent_feeds.get(url) or await self._fetch_feedparser_object(url)
 
         if not feedparser_obj:
             await ctx.send("Couldn't fetch that feed.")
             return
         if feedparser_obj.entries:
             # this feed has posts
-            feedparser_plus_obj = await self._add_to_feedparser_object(feedparser_obj.entries[0], rss_feed["url"])
+            feedparser_plus_obj = self._get_lazy_tags(feedparser_obj.entries[0], url)
         else:
             # this feed does not have posts, but it has a header with channel information
-            feedparser_plus_obj = await self._add_to_feedparser_object(feedparser_obj.feed, rss_feed["url"])
+            feedparser_plus_obj = self._get_lazy_tags(feedparser_obj.feed, url)
+        if not feedparser_plus_obj.is_built(None):
+            entry_size = self._get_entry_html_size(feedparser_plus_obj.entry)
+            await self._run_parse_job(entry_size, feedparser_plus_obj.build, None)
 
         for tag_name, tag_content in sorted(feedparser_plus_obj.items()):
             if tag_name in INTERNAL_TAGS:
                 # these tags attached to the rss feed object are for internal handling options
                 continue
 
-            tag_content_check = await self._get_tag_content_type(tag_content)
+            tag_content_check = self._get_tag_content_type(tag_content)
             if tag_content_check == TagType.HTML:
                 msg += f"[X] ${tag_name}\n\t"
             elif tag_content_check == TagType.DICT:
@@ -1151,6 +1787,270 @@ class RSS(commands.Cog):
         else:
             await ctx.send("Feed not found!")
 
+    @checks.is_owner()
+    @rss.group(name="scheduler")
+    async def _rss_scheduler(self, ctx):
+        """
+        Change how feeds are checked.
+
+        This is a global change for all feeds.
+        By default feeds are checked one at a time, spread across a 5 minute window.
+        Setting a worker count above zero checks feeds concurrently instead, limited per website and by an overall request rate.
+        Feeds in the same channel are always posted in the same order as they are in the serial mode.
+        """
+        pass
+
+    @_rss_scheduler.command(name="adaptive")
+    async def _rss_scheduler_adaptive(self, ctx):
+        """
+        Toggle adaptive polling.
+
+        With adaptive polling, each feed learns how often it publishes and is only checked when it is due.
+        Busy feeds are checked as often as the minimum interval, quiet feeds back off to the maximum interval.
+        Set the intervals with `[p]rss scheduler interval`.
+        """
+        adaptive_polling = not await self.config.adaptive_polling()
+        await self.config.adaptive_polling.set(adaptive_polling)
+        await ctx.send(f"Adaptive polling is now {'enabled' if adaptive_polling else 'disabled'}.")
+
+    @_rss_scheduler.command(name="circuits")
+    async def _rss_scheduler_circuits(self, ctx):
+        """
+        List the websites whose feeds are being skipped because they keep failing.
+
+        After 3 failed requests in a row, a website is skipped for 1 minute, doubling each time it fails again
+        up to 6 hours. One request is let through when the wait is over, and a success puts the website back to normal.
+        """
+        circuits = self._host_circuits.get_open_circuits()
+        if not circuits:
+            await ctx.send("No websites are being skipped.")
+            return
+        msg = "[ Skipped Websites ]\n\n"
+        for circuit in circuits:
+            msg += f"{circuit['host']}\n"
+            msg += f"\t[Failures in a row]: {circuit['failures']}\n"
+            msg += f"\t[Next try in]:       {int(circuit['retry_in'])} seconds\n"
+            msg += f"\t[Last error]:        {circuit['last_error']}\n"
+        for page in pagify(msg, delims=["\n\n", "\n"], page_length=1800):
+            await ctx.send(box(page, lang="ini"))
+
+    @_rss_scheduler.command(name="hostlimit")
+    async def _rss_scheduler_hostlimit(self, ctx, limit: int):
+        """
+        Set how many feeds from the same website can be fetched at once.
+
+        Only used when the scheduler worker count is above zero.
+        """
+        if limit < 1:
+            await ctx.send("The per-website limit must be at least 1.")
+            return
+        await self.config.scheduler_host_limit.set(limit)
+        await ctx.send(f"Up to {limit} feeds from the same website will be fetched at once.")
+
+    @_rss_scheduler.command(name="interval")
+    async def _rss_scheduler_interval(self, ctx, min_minutes: int, max_minutes: int):
+        """
+        Set the shortest and longest time between checks of a feed with adaptive polling.
+
+        Defaults to 5 minutes and 360 minutes.
+        """
+        if min_minutes < 1:
+            await ctx.send("The minimum interval must be at least 1 minute.")
+            return
+        if max_minutes < min_minutes:
+            await ctx.send("The maximum interval cannot be less than the minimum interval.")
+            return
+        await self.config.adaptive_min_interval.set(min_minutes * 60)
+        await self.config.adaptive_max_interval.set(max_minutes * 60)
+        await ctx.send(
+            f"With adaptive polling, feeds will be checked every {min_minutes} to {max_minutes} minutes."
+        )
+
+    @_rss_scheduler.command(name="maxsize")
+    async def _rss_scheduler_maxsize(self, ctx, kilobytes: int):
+        """
+        Set the largest feed or page, in kilobytes, that will be downloaded. Use 0 for unlimited.
+
+        Downloads are stopped as soon as they go over this size. Defaults to 10240 (10 MB).
+        """
+        if kilobytes < 0:
+            await ctx.send("The size limit cannot be less than zero.")
+            return
+        await self.config.max_content_size.set(kilobytes * 1024)
+        if kilobytes:
+            await ctx.send(f"Downloads over {kilobytes} KB will be stopped.")
+        else:
+            await ctx.send("Downloads are no longer size limited.")
+
+    @_rss_scheduler.command(name="parsesize")
+    async def _rss_scheduler_parsesize(self, ctx, size: int):
+        """
+        Set the document size, in characters, from which feed parsing is moved off the bot's event loop.
+
+        Use 0 to always parse in the background pool.
+        Large feeds can take long enough to parse that the bot stops responding for a moment.
+        """
+        if size < 0:
+            await ctx.send("The parse size cannot be less than zero.")
+            return
+        await self.config.parse_offload_size.set(size)
+        await self._load_parse_settings()
+        await ctx.send(f"Feed documents of {size} characters or more will be parsed in the background pool.")
+
+    @_rss_scheduler.command(name="parseworkers")
+    async def _rss_scheduler_parseworkers(self, ctx, workers: int):
+        """Set how many feed documents can be parsed at once in the background pool."""
+        if workers < 1:
+            await ctx.send("The parse worker count must be at least 1.")
+            return
+        if workers > 32:
+            workers = 32
+        await self.config.parse_workers.set(workers)
+        await self._load_parse_settings()
+        await ctx.send(f"Up to {workers} feed documents will be parsed at once in the background pool.")
+
+    @_rss_scheduler.command(name="ratelimit")
+    async def _rss_scheduler_ratelimit(self, ctx, requests_per_second: float):
+        """
+        Set how many feed requests can be started per second. Use 0 for unlimited.
+
+        Only used when the scheduler worker count is above zero.
+        """
+        if requests_per_second < 0:
+            await ctx.send("The rate limit cannot be less than zero.")
+            return
+        await self.config.scheduler_rate_limit.set(requests_per_second)
+        if requests_per_second:
+            await ctx.send(f"Feed requests will be started at up to {requests_per_second} per second.")
+        else:
+            await ctx.send("Feed requests are no longer rate limited.")
+
+    @_rss_scheduler.command(name="settings")
+    async def _rss_scheduler_settings(self, ctx):
+        """Show the current scheduler settings."""
+        workers = await self.config.scheduler_workers()
+        host_limit = await self.config.scheduler_host_limit()
+        rate_limit = await self.config.scheduler_rate_limit()
+        parse_workers = await self.config.parse_workers()
+        parse_offload_size = await self.config.parse_offload_size()
+        adaptive_polling = await self.config.adaptive_polling()
+        min_interval = await self.config.adaptive_min_interval()
+        max_interval = await self.config.adaptive_max_interval()
+        max_content_size = await self.config.max_content_size()
+        storage_engine = self._store.name
+        sharding = await self.config.sharding()
+        if sharding == "hash":
+            shard_index, shard_count = await self._shards.get_shard()
+            sharding = f"hash, process {shard_index + 1} of {shard_count}"
+        mode = f"concurrent, {workers} workers" if workers else "serial"
+        msg = f"[Mode]:                {mode}\n"
+        msg += f"[Per-website limit]:   {host_limit}\n"
+        msg += f"[Requests per second]: {rate_limit or 'unlimited'}\n"
+        msg += f"[Parse workers]:       {parse_workers}\n"
+        msg += f"[Parse offload size]:  {parse_offload_size} characters\n"
+        msg += f"[Adaptive polling]:    {'on' if adaptive_polling else 'off'}, "
+        msg += f"every {min_interval // 60} to {max_interval // 60} minutes\n"
+        msg += f"[Download size limit]: {f'{max_content_size // 1024} KB' if max_content_size else 'unlimited'}\n"
+        msg += f"[Storage engine]:      {storage_engine}\n"
+        msg += f"[Sharding]:            {sharding}"
+        await ctx.send(box(msg, lang="ini"))
+
+    @_rss_scheduler.command(name="sharding")
+    async def _rss_scheduler_sharding(self, ctx, mode: str):
+        """
+        Split feed polling between several bot processes that share the same Config backend.
+
+        `off` - every process polls every feed it can reach (the default).
+        `hash` - feeds are spread evenly over the running processes, and each feed is leased
+        to one process at a time so that the same entry is never posted twice.
+        `guild` - each process only polls channels in the guilds on its own gateway shards.
+
+        Set the same mode on every process.
+        """
+        mode = mode.lower()
+        if mode not in ["off", "hash", "guild"]:
+            await ctx.send("The sharding mode must be `off`, `hash` or `guild`.")
+            return
+        await self.config.sharding.set(mode)
+        if mode == "hash":
+            await self._shards.heartbeat()
+            shard_index, shard_count = await self._shards.get_shard()
+            await ctx.send(
+                f"Feeds are now spread over {shard_count} running process(es), this one is number {shard_index + 1}. "
+                "The split takes effect from the next sweep."
+            )
+        elif mode == "guild":
+            await ctx.send("Each process will now only poll channels in the guilds it can see.")
+        else:
+            await self._shards.leave()
+            await ctx.send("Sharding is off, this process will poll every feed.")
+
+    @_rss_scheduler.command(name="storage")
+    async def _rss_scheduler_storage(self, ctx, engine: str):
+        """
+        Choose where feeds are saved: `config` (the default) or `sqlite`.
+
+        The sqlite engine keeps feeds in a local database file, where saving the result of a feed check
+        only writes that one feed. It's meant for bots with thousands of feeds.
+        Feeds are copied over to the chosen engine when switching.
+        """
+        engine = engine.lower()
+        if engine not in ["config", "sqlite"]:
+            await ctx.send("The storage engine must be `config` or `sqlite`.")
+            return
+        if engine == self._store.name:
+            await ctx.send(f"Feeds are already saved with the {engine} engine.")
+            return
+
+        async with ctx.typing():
+            # stop checking feeds so that nothing is saved to the old engine during the copy
+            if self._read_feeds_loop:
+                self._read_feeds_loop.cancel()
+            old_store = self._store
+            new_store = None
+            try:
+                if engine == "sqlite":
+                    new_store = await self._open_sqlite_store()
+                    await new_store.import_channels(await self.config.all_channels())
+                else:
+                    new_store = ConfigFeedStore(self.config)
+                    all_channels = await old_store.export_channels()
+                    await self.config.clear_all_channels()
+                    for channel_id, data in all_channels.items():
+                        await self.config.channel_from_id(channel_id).feeds.set(data["feeds"])
+            except Exception:
+                log.error(f"Failed to move RSS feeds to the {engine} engine.", exc_info=True)
+                if new_store is not None:
+                    await new_store.close()
+                await ctx.send(f"The feeds couldn't be moved to the {engine} engine. Check your console for details.")
+                self._read_feeds_loop = self.bot.loop.create_task(self.read_feeds())
+                return
+
+            self._store = new_store
+            await self.config.storage_engine.set(engine)
+            await old_store.close()
+            self._post_queue = asyncio.PriorityQueue()
+            self._read_feeds_loop = self.bot.loop.create_task(self.read_feeds())
+        await ctx.send(f"Feeds are now saved with the {engine} engine.")
+
+    @_rss_scheduler.command(name="workers")
+    async def _rss_scheduler_workers(self, ctx, workers: int):
+        """
+        Set how many feeds can be checked at once. Use 0 for the default serial mode.
+
+        The change is applied on the next feed check cycle.
+        """
+        if workers < 0:
+            await ctx.send("The worker count cannot be less than zero.")
+            return
+        if workers > 100:
+            workers = 100
+        await self.config.scheduler_workers.set(workers)
+        if workers:
+            await ctx.send(f"Feeds will be checked by {workers} concurrent workers.")
+        else:
+            await ctx.send("Feeds will be checked one at a time.")
+
     @rss.command(name="showtemplate")
     async def _rss_show_template(self, ctx, feed_name: str, channel: Optional[discord.TextChannel] = None):
         """Show the template in use for a specific feed."""
@@ -1159,7 +2059,7 @@ class RSS(commands.Cog):
         if not channel_permission_check:
             return
 
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("No feed with that name in this channel.")
             return
@@ -1208,6 +2108,50 @@ class RSS(commands.Cog):
         for page in pagify(msg, delims=["\n"], page_length=1800):
             await ctx.send(page)
 
+    @checks.is_owner()
+    @rss.command(name="stats")
+    async def _rss_stats(self, ctx, count: int = 10):
+        """
+        Show the slowest and most error-prone feeds from recent feed checks.
+
+        Times are averages over the last few checks of each feed url since the cog was loaded.
+        Total time is the fetch time plus the parse and tag building time.
+        """
+        count = max(1, min(count, 25))
+        last_sweep = self._feed_stats.get_last_sweep()
+        summaries = self._feed_stats.get_feed_summaries()
+        if not last_sweep and not summaries:
+            await ctx.send("No feeds have been checked since the cog was loaded.")
+            return
+
+        msg = "[ Feed check cycle ]\n\n\t"
+        if last_sweep:
+            sweep_time, feed_count = last_sweep
+            average_sweep_time = self._feed_stats.get_average_sweep_time()
+            target = "within" if sweep_time <= 300 else "over"
+            msg += f"Last cycle: {feed_count} feeds in {sweep_time:.1f}s, {target} the 300s target\n\t"
+            msg += f"Average cycle: {average_sweep_time:.1f}s\n\n"
+        else:
+            msg += "The first cycle hasn't finished yet.\n\n"
+
+        msg += "[ Slowest feeds ]\n\n\t"
+        for summary in sorted(summaries, key=lambda x: x["total_time"], reverse=True)[:count]:
+            msg += f"{summary['url']}\n\t"
+            msg += f"  total {summary['total_time']:.2f}s | fetch {summary['fetch_time']:.2f}s "
+            msg += f"(max {summary['max_fetch_time']:.2f}s) | parse {summary['parse_time']:.2f}s "
+            msg += f"| tags {summary['enrich_time']:.2f}s | {summary['size'] / 1024:.0f} KiB\n\t"
+
+        error_summaries = [summary for summary in summaries if summary["errors"]]
+        msg += "\n[ Feeds with errors ]\n\n\t"
+        if not error_summaries:
+            msg += "None."
+        for summary in sorted(error_summaries, key=lambda x: x["errors"], reverse=True)[:count]:
+            msg += f"{summary['url']}\n\t"
+            msg += f"  {summary['errors']} errors in {summary['checks']} checks | last status {summary['status']}\n\t"
+
+        for page in pagify(msg, delims=["\n\t", "\n\n"], page_length=1800):
+            await ctx.send(box(page, lang="ini"))
+
     @rss.group(name="tag")
     async def _rss_tag(self, ctx):
         """RSS post tag qualification."""
@@ -1224,19 +2168,18 @@ class RSS(commands.Cog):
         Tags can be found in `[p]rss listtags` under `$tags` or `$tags_list` (if tags are present in the feed - not all feeds have tags).
         """
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
 
-        async with self.config.channel(channel).feeds() as feed_data:
-            allowed_tags = feed_data[feed_name].get("allowed_tags", [])
-            if tag.lower() in [x.lower() for x in allowed_tags]:
-                return await ctx.send(
-                    f"{bold(await self._title_case(tag))} is already in the allowed list for {bold(feed_name)}."
-                )
-            allowed_tags.append(tag.lower())
-            feed_data[feed_name]["allowed_tags"] = allowed_tags
+        allowed_tags = rss_feed.get("allowed_tags", [])
+        if tag.lower() in [x.lower() for x in allowed_tags]:
+            return await ctx.send(
+                f"{bold(await self._title_case(tag))} is already in the allowed list for {bold(feed_name)}."
+            )
+        allowed_tags.append(tag.lower())
+        await self._store.update_feed(channel.id, feed_name, {"allowed_tags": allowed_tags})
 
         await ctx.send(
             f"{bold(await self._title_case(tag))} was added to the list of allowed tags for {bold(feed_name)}. "
@@ -1249,7 +2192,7 @@ class RSS(commands.Cog):
         List allowed tags for feed post qualification.
         """
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
@@ -1273,23 +2216,23 @@ class RSS(commands.Cog):
         No regex or placeholder qualification.
         """
         channel = channel or ctx.channel
-        rss_feed = await self.config.channel(channel).feeds.get_raw(feed_name, default=None)
+        rss_feed = await self._store.get_feed(channel.id, feed_name)
         if not rss_feed:
             await ctx.send("That feed name doesn't exist in this channel.")
             return
 
-        async with self.config.channel(channel).feeds() as feed_data:
-            allowed_tags = feed_data[feed_name].get("allowed_tags", [])
-            try:
-                allowed_tags.remove(tag.lower())
-                feed_data[feed_name]["allowed_tags"] = allowed_tags
-                await ctx.send(
-                    f"{bold(await self._title_case(tag))} was removed from the list of allowed tags for {bold(feed_name)}."
-                )
-            except ValueError:
-                await ctx.send(
-                    f"{bold(await self._title_case(tag))} was not found in the allow list for {bold(feed_name)}."
-                )
+        allowed_tags = rss_feed.get("allowed_tags", [])
+        try:
+            allowed_tags.remove(tag.lower())
+        except ValueError:
+            await ctx.send(
+                f"{bold(await self._title_case(tag))} was not found in the allow list for {bold(feed_name)}."
+            )
+            return
+        await self._store.update_feed(channel.id, feed_name, {"allowed_tags": allowed_tags})
+        await ctx.send(
+            f"{bold(await self._title_case(tag))} was removed from the list of allowed tags for {bold(feed_name)}."
+        )
 
     @rss.command(name="template")
     async def _rss_template(
@@ -1320,8 +2263,22 @@ class RSS(commands.Cog):
         """Show the RSS version."""
         await ctx.send(f"RSS version {__version__}")
 
-    async def get_current_feed(self, channel: discord.TextChannel, name: str, rss_feed: dict, *, force: bool = False):
-        """Takes an RSS feed and builds an object with all extra tags"""
+    async def get_current_feed(
+        self,
+        channel: discord.TextChannel,
+        name: str,
+        rss_feed: dict,
+        *,
+        force: bool = False,
+        feedparser_obj: Optional[feedparser.util.FeedParserDict] = None,
+        validators: Optional[dict] = None,
+    ):
+        """
+        Takes an RSS feed and builds an object with all extra tags.
+
+        feedparser_obj and the validators used to fetch it can be passed in when the feed
+        was already fetched, like by the concurrent scheduler.
+        """
         log.debug(f"getting feed {name} on cid {channel.id}")
         url = rss_feed["url"]
         last_title = rss_feed["last_title"]
@@ -1332,106 +2289,135 @@ class RSS(commands.Cog):
         template = rss_feed["template"]
         message = None
 
-        feedparser_obj = await self._fetch_feedparser_object(url)
+        if feedparser_obj is None:
+            if force:
+                # rss force should always get the full feed content, a full parse from the last few minutes will do
+                validators = None
+                feedparser_obj = self._recent_feeds.get(url) or await self._fetch_feedparser_object(url)
+            else:
+                validators = self._get_feed_validators(rss_feed)
+                feedparser_obj, validators = await self._fetch_feed_for_sweep(url, validators)
         if not feedparser_obj:
             return
         try:
             log.debug(f"{feedparser_obj.error} Channel: {channel.id}")
+            if getattr(feedparser_obj, "not_modified", False) and not force:
+                await self._adjust_poll_interval(channel, name, rss_feed, None, found_new=False)
             return
         except AttributeError:
             pass
 
-        # sorting the entire feedparser object by updated_parsed time if it exists, if not then published_parsed
-        # certain feeds can be rearranged by a user, causing all posts to be out of sequential post order
-        # or some feeds are out of time order by default
-        if feedparser_obj.entries:
-            # this feed has posts
-            sorted_feed_by_post_time = await self._sort_by_post_time(feedparser_obj.entries)
+        if not force and rss_feed.get("seen_ids", None) is not None:
+            # feeds checked since RSS 1.11.0 have an index of the entries they have already seen
+            new_entries = await self._get_unseen_entries(channel, name, rss_feed, feedparser_obj, validators)
+            feedparser_plus_objects = [self._get_lazy_tags(entry, url) for entry in new_entries]
         else:
-            # this feed does not have posts, but it has a header with channel information
-            sorted_feed_by_post_time = [feedparser_obj.feed]
+            # sorting the entire feedparser object by updated_parsed time if it exists, if not then published_parsed
+            # certain feeds can be rearranged by a user, causing all posts to be out of sequential post order
+            # or some feeds are out of time order by default
+            if feedparser_obj.entries:
+                # this feed has posts
+                sorted_feed_by_post_time = await self._sort_by_post_time(feedparser_obj.entries)
+            else:
+                # this feed does not have posts, but it has a header with channel information
+                sorted_feed_by_post_time = [feedparser_obj.feed]
 
-        if not force:
-            entry_time = await self._time_tag_validation(sorted_feed_by_post_time[0])
-            if (last_time and entry_time) is not None:
-                if last_time > entry_time:
-                    log.debug("Not posting because new entry is older than last saved entry.")
-                    return
-            try:
-                title = sorted_feed_by_post_time[0].title
-            except AttributeError:
-                title = ""
-            try:
-                link = sorted_feed_by_post_time[0].link
-            except AttributeError:
-                link = ""
-            await self._update_last_scraped(channel, name, title, link, entry_time)
-
-        feedparser_plus_objects = []
-        for entry in sorted_feed_by_post_time:
-            # sometimes there's no title or no link attribute and feedparser doesn't really play nice with that
-            try:
-                entry_title = entry.title
-            except AttributeError:
-                entry_title = ""
-            try:
-                entry_link = entry.link
-            except AttributeError:
-                entry_link = ""
+            if not force:
+                entry_time = await self._time_tag_validation(sorted_feed_by_post_time[0])
+                try:
+                    title = sorted_feed_by_post_time[0].title
+                except AttributeError:
+                    title = ""
+                try:
+                    link = sorted_feed_by_post_time[0].link
+                except AttributeError:
+                    link = ""
+                found_new = (title, link, entry_time) != (last_title, last_link, last_time)
+                poll_interval = await self._adjust_poll_interval(
+                    channel, name, rss_feed, sorted_feed_by_post_time, found_new=found_new
+                )
+                if (last_time and entry_time) is not None:
+                    if last_time > entry_time:
+                        log.debug("Not posting because new entry is older than last saved entry.")
+                        return
+                # seed the seen-entry index, the next check will use it instead of this title/link/time matching
+                seen_ids = self._update_seen_index([], sorted_feed_by_post_time)
+                await self._update_last_scraped(
+                    channel,
+                    name,
+                    title,
+                    link,
+                    entry_time,
+                    **(validators or {}),
+                    **({"poll_interval": poll_interval} if poll_interval is not None else {}),
+                    seen_ids=seen_ids,
+                )
 
-            # find the updated_parsed (checked first) or an published_parsed tag if they are present
-            entry_time = await self._time_tag_validation(entry)
+            feedparser_plus_objects = []
+            for entry in sorted_feed_by_post_time:
+                # sometimes there's no title or no link attribute and feedparser doesn't really play nice with that
+                try:
+                    entry_title = entry.title
+                except AttributeError:
+                    entry_title = ""
+                try:
+                    entry_link = entry.link
+                except AttributeError:
+                    entry_link = ""
 
-            # we only need one feed entry if this is from rss force
-            if force:
-                feedparser_plus_obj = await self._add_to_feedparser_object(entry, url)
-                feedparser_plus_objects.append(feedparser_plus_obj)
-                break
+                # find the updated_parsed (checked first) or an published_parsed tag if they are present
+                entry_time = await self._time_tag_validation(entry)
 
-            # if this feed has a published_parsed or an updated_parsed tag, it will use
-            # that time value present in entry_time to verify that the post is new.
-            elif (entry_time and last_time) is not None:
-                # now that we are sorting by/saving updated_parsed instead of published_parsed (rss 1.4.0+)
-                # we can post an update for a post that already exists and has already been posted.
-                # this will only work for rss sites that are single-use like cloudflare status, discord status, etc
-                # where an update on the last post should be posted
-                # this can be overridden by a bot owner in the rss parse command, per problematic website
-                if (last_title == entry_title) and (last_link == entry_link) and (last_time < entry_time):
-                    log.debug(f"New update found for an existing post in {name} on cid {channel.id}")
-                    feedparser_plus_obj = await self._add_to_feedparser_object(entry, url)
+                # we only need one feed entry if this is from rss force
+                if force:
+                    feedparser_plus_obj = self._get_lazy_tags(entry, url)
                     feedparser_plus_objects.append(feedparser_plus_obj)
-                # regular feed qualification after this
-                if (last_link != entry_link) and (last_time < entry_time):
-                    log.debug(f"New entry found via time and link validation for feed {name} on cid {channel.id}")
-                    feedparser_plus_obj = await self._add_to_feedparser_object(entry, url)
-                    feedparser_plus_objects.append(feedparser_plus_obj)
-                if (last_title == "" and entry_title == "") and (last_link != entry_link) and (last_time < entry_time):
-                    log.debug(f"New entry found via time validation for feed {name} on cid {channel.id} - no title")
-                    feedparser_plus_obj = await self._add_to_feedparser_object(entry, url)
-                    feedparser_plus_objects.append(feedparser_plus_obj)
-
-            # this is a post that has no time information attached to it and we can only
-            # verify that the title and link did not match the previously posted entry
-            elif (entry_time or last_time) is None:
-                if last_title == entry_title and last_link == entry_link:
-                    log.debug(f"Breaking rss entry loop for {name} on {channel.id}, via link match")
                     break
-                else:
-                    log.debug(f"New entry found for feed {name} on cid {channel.id} via new link or title")
-                    feedparser_plus_obj = await self._add_to_feedparser_object(entry, url)
-                    feedparser_plus_objects.append(feedparser_plus_obj)
 
-            # we found a match for a previous feed post
-            else:
-                log.debug(
-                    f"Breaking rss entry loop for {name} on {channel.id}, we found where we are supposed to be caught up to"
-                )
-                break
+                # if this feed has a published_parsed or an updated_parsed tag, it will use
+                # that time value present in entry_time to verify that the post is new.
+                elif (entry_time and last_time) is not None:
+                    # now that we are sorting by/saving updated_parsed instead of published_parsed (rss 1.4.0+)
+                    # we can post an update for a post that already exists and has already been posted.
+                    # this will only work for rss sites that are single-use like cloudflare status, discord status, etc
+                    # where an update on the last post should be posted
+                    # this can be overridden by a bot owner in the rss parse command, per problematic website
+                    if (last_title == entry_title) and (last_link == entry_link) and (last_time < entry_time):
+                        log.debug(f"New update found for an existing post in {name} on cid {channel.id}")
+                        feedparser_plus_obj = self._get_lazy_tags(entry, url)
+                        feedparser_plus_objects.append(feedparser_plus_obj)
+                    # regular feed qualification after this
+                    if (last_link != entry_link) and (last_time < entry_time):
+                        log.debug(f"New entry found via time and link validation for feed {name} on cid {channel.id}")
+                        feedparser_plus_obj = self._get_lazy_tags(entry, url)
+                        feedparser_plus_objects.append(feedparser_plus_obj)
+                    if (last_title == "" and entry_title == "") and (last_link != entry_link) and (last_time < entry_time):
+                        log.debug(f"New entry found via time validation for feed {name} on cid {channel.id} - no title")
+                        feedparser_plus_obj = self._get_lazy_tags(entry, url)
+                        feedparser_plus_objects.append(feedparser_plus_obj)
+
+                # this is a post that has no time information attached to it and we can only
+                # verify that the title and link did not match the previously posted entry
+                elif (entry_time or last_time) is None:
+                    if last_title == entry_title and last_link == entry_link:
+                        log.debug(f"Breaking rss entry loop for {name} on {channel.id}, via link match")
+                        break
+                    else:
+                        log.debug(f"New entry found for feed {name} on cid {channel.id} via new link or title")
+                        feedparser_plus_obj = self._get_lazy_tags(entry, url)
+                        feedparser_plus_objects.append(feedparser_plus_obj)
 
-        # nothing in the whole feed matched to what was saved, so let's only post 1 instead of every single post
-        if len(feedparser_plus_objects) == len(sorted_feed_by_post_time):
-            log.debug(f"Couldn't match anything for feed {name} on cid {channel.id}, only posting 1 post")
-            feedparser_plus_objects = [feedparser_plus_objects[0]]
+                # we found a match for a previous feed post
+                else:
+                    log.debug(
+                        f"Breaking rss entry loop for {name} on {channel.id}, we found where we are supposed to be caught up to"
+                    )
+                    break
+
+            # nothing in the whole feed matched to what was saved, so let's only post 1 instead of every single post
+            if len(feedparser_plus_objects) == len(sorted_feed_by_post_time):
+                log.debug(f"Couldn't match anything for feed {name} on cid {channel.id}, only posting 1 post")
+                feedparser_plus_objects = [feedparser_plus_objects[0]]
 
         if not feedparser_plus_objects:
             # early-exit so that we don't dispatch when there's no updates
@@ -1441,20 +2427,84 @@ class RSS(commands.Cog):
         feedparser_plus_objects.reverse()
 
         # list of feedparser_plus_objects wrapped in MappingProxyType
-        # filled during the loop below
+        # filled as the posts from the loop below are sent
         proxied_dicts = []
+        # posts are sent later by the post buffer, the events go out once they have been,
+        # and only for the posts that made it. The loop itself counts as one until it's done.
+        unresolved = 1
+        enrich_time = 0.0
+
+        def post_resolved(feedparser_dict_proxy=None, sent=False):
+            nonlocal unresolved
+            if sent:
+                proxied_dicts.append(feedparser_dict_proxy)
+                # This event can be used in 3rd-party using listeners.
+                # This may (and most likely will) get changes in the future
+                # so I suggest accepting **kwargs in the listeners using this event.
+                #
+                # channel: discord.TextChannel
+                #     The channel feed alert went to.
+                # feed_data: Mapping[str, Any]
+                #     Read-only mapping with feed's data.
+                #     The available data depends on what this cog needs
+                #     and there most likely will be changes here in future.
+                #     Available keys include: `name`, `template`, `url`, `embed`, etc.
+                # feedparser_dict: Mapping[str, Any]
+                #     Read-only mapping with parsed data from the feed.
+                #     See documentation of feedparser.FeedParserDict for more information.
+                # force: bool
+                #     True if the update was forced (through `[p]rss force`), False otherwise.
+                self.bot.dispatch(
+                    "aikaternacogs_rss_message",
+                    channel=channel,
+                    feed_data=MappingProxyType(rss_feed),
+                    feedparser_dict=feedparser_dict_proxy,
+                    force=force,
+                )
+            unresolved -= 1
+            if unresolved:
+                return
+
+            # This event can be used in 3rd-party using listeners.
+            # This may (and most likely will) get changes in the future
+            # so I suggest accepting **kwargs in the listeners using this event.
+            #
+            # channel: discord.TextChannel
+            #     The channel feed alerts went to.
+            # feed_data: Mapping[str, Any]
+            #     Read-only mapping with feed's data.
+            #     The available data depends on what this cog needs
+            #     and there most likely will be changes here in future.
+            #     Available keys include: `name`, `template`, `url`, `embed`, etc.
+            # feedparser_dicts: List[Mapping[str, Any]]
+            #     List of read-only mappings with parsed data
+            #     from each **new** entry in the feed.
+            #     See documentation of feedparser.FeedParserDict for more information.
+            # force: bool
+            #     True if the update was forced (through `[p]rss force`), False otherwise.
+            self._feed_stats.record_post(url, enrich_seconds=enrich_time, posted=len(proxied_dicts))
+            self.bot.dispatch(
+                "aikaternacogs_rss_feed_update",
+                channel=channel,
+                feed_data=MappingProxyType(rss_feed),
+                feedparser_dicts=proxied_dicts,
+                force=force,
+            )
+
+        # only the tags used by the template and the embed/tag settings are built for each post
+        to_fill, template_tags = self._get_compiled_template(channel.id, name, template)
+        allowed_tags = rss_feed.get("allowed_tags", [])
+        used_tags = [tag for tag in template_tags if tag != "name"]
+        used_tags += [rss_feed.get("embed_image", None), rss_feed.get("embed_thumbnail", None)]
+        if allowed_tags:
+            used_tags.append("tags_list")
 
         for feedparser_plus_obj in feedparser_plus_objects:
-            try:
-                curr_title = feedparser_plus_obj.title
-            except AttributeError:
-                curr_title = ""
-            except IndexError:
-                log.debug(f"No entries found for feed {name} on cid {channel.id}")
-                return
+            enrich_start = time.monotonic()
+            await self._prepare_lazy_tags(feedparser_plus_obj, used_tags)
+            enrich_time += time.monotonic() - enrich_start
 
             # allowed tag verification section
-            allowed_tags = rss_feed.get("allowed_tags", [])
             if len(allowed_tags) > 0:
                 allowed_post_tags = [x.lower() for x in allowed_tags]
                 feed_tag_list = [x.lower() for x in feedparser_plus_obj.get("tags_list", [])]
@@ -1466,8 +2516,7 @@ class RSS(commands.Cog):
                     continue
 
             # starting to fill out the template for feeds that passed tag verification (if present)
-            to_fill = QuietTemplate(template)
-            message = to_fill.quiet_safe_substitute(name=bold(name), **feedparser_plus_obj)
+            message = to_fill.quiet_safe_substitute(feedparser_plus_obj, name=bold(name))
 
             if len(message.strip(" ")) == 0:
                 message = None
@@ -1485,62 +2534,18 @@ class RSS(commands.Cog):
                 # rss_limit needs + 8 characters for pagify counting codeblock characters
                 message = list(pagify(message, delims=["\n", " "], priority=True, page_length=(rss_limit + 8)))[0]
 
+            # the callback goes on the entry's last message, messages to a channel go out in order
+            unresolved += 1
+            callback = functools.partial(post_resolved, MappingProxyType(feedparser_plus_obj))
             if embed_toggle and red_embed_settings and embed_permissions:
-                await self._get_current_feed_embed(channel, rss_feed, feedparser_plus_obj, message)
+                await self._get_current_feed_embed(channel, rss_feed, feedparser_plus_obj, message, callback)
             else:
-                for page in pagify(message, delims=["\n"]):
-                    await channel.send(page)
-
-            # This event can be used in 3rd-party using listeners.
-            # This may (and most likely will) get changes in the future
-            # so I suggest accepting **kwargs in the listeners using this event.
-            #
-            # channel: discord.TextChannel
-            #     The channel feed alert went to.
-            # feed_data: Mapping[str, Any]
-            #     Read-only mapping with feed's data.
-            #     The available data depends on what this cog needs
-            #     and there most likely will be changes here in future.
-            #     Available keys include: `name`, `template`, `url`, `embed`, etc.
-            # feedparser_dict: Mapping[str, Any]
-            #     Read-only mapping with parsed data from the feed.
-            #     See documentation of feedparser.FeedParserDict for more information.
-            # force: bool
-            #     True if the update was forced (through `[p]rss force`), False otherwise.
-            feedparser_dict_proxy = MappingProxyType(feedparser_plus_obj)
-            proxied_dicts.append(feedparser_dict_proxy)
-            self.bot.dispatch(
-                "aikaternacogs_rss_message",
-                channel=channel,
-                feed_data=MappingProxyType(rss_feed),
-                feedparser_dict=feedparser_dict_proxy,
-                force=force,
-            )
+                pages = list(pagify(message, delims=["\n"]))
+                for page in pages[:-1]:
+                    await self._post_buffer.add_text(channel, page)
+                await self._post_buffer.add_text(channel, pages[-1], callback=callback)
 
-        # This event can be used in 3rd-party using listeners.
-        # This may (and most likely will) get changes in the future
-        # so I suggest accepting **kwargs in the listeners using this event.
-        #
-        # channel: discord.TextChannel
-        #     The channel feed alerts went to.
-        # feed_data: Mapping[str, Any]
-        #     Read-only mapping with feed's data.
-        #     The available data depends on what this cog needs
-        #     and there most likely will be changes here in future.
-        #     Available keys include: `name`, `template`, `url`, `embed`, etc.
-        # feedparser_dicts: List[Mapping[str, Any]]
-        #     List of read-only mappings with parsed data
-        #     from each **new** entry in the feed.
-        #     See documentation of feedparser.FeedParserDict for more information.
-        # force: bool
-        #     True if the update was forced (through `[p]rss force`), False otherwise.
-        self.bot.dispatch(
-            "aikaternacogs_rss_feed_update",
-            channel=channel,
-            feed_data=MappingProxyType(rss_feed),
-            feedparser_dicts=proxied_dicts,
-            force=force,
-        )
+        post_resolved()
 
     async def _get_current_feed_embed(
         self,
@@ -1548,6 +2553,7 @@ class RSS(commands.Cog):
         rss_feed: dict,
         feedparser_plus_obj: feedparser.util.FeedParserDict,
         message: str,
+        callback=None,
     ):
         embed_list = []
         for page in pagify(message, delims=["\n"]):
@@ -1590,26 +2596,37 @@ class RSS(commands.Cog):
         except KeyError:
             pass
 
-        for embed in embed_list:
-            await channel.send(embed=embed)
+        for embed in embed_list[:-1]:
+            await self._post_buffer.add_embed(channel, embed)
+        await self._post_buffer.add_embed(channel, embed_list[-1], callback=callback)
 
     async def read_feeds(self):
         """Feed poster loop."""
         await self.bot.wait_until_red_ready()
+        await self._load_parse_settings()
         await self._put_feeds_in_queue()
         self._post_queue_size = self._post_queue.qsize()
         while True:
             try:
+                workers = await self.config.scheduler_workers()
+                if workers:
+                    await self._run_concurrent_sweep(workers)
+                    continue
+
                 queue_item = await self._get_next_in_queue()
                 if not queue_item:
                     # the queue is empty
-                    config_data = await self.config.all_channels()
-                    if not config_data:
+                    if not await self._store.get_channel_ids():
                         # nothing to check
                         log.debug(f"Sleeping, nothing to do")
                         await asyncio.sleep(30)
                         continue
-                    if self._post_queue_size < 300:
+                    self._feed_stats.record_sweep(
+                        seconds=time.monotonic() - self._sweep_started, feed_count=self._post_queue_size
+                    )
+                    if await self.config.adaptive_polling():
+                        wait = await self._get_adaptive_wait()
+                    elif self._post_queue_size < 300:
                         # less than 300 entries to check means 1/sec check times
                         # the wait is (5 min - entry count) before posting again
                         wait = 300 - self._post_queue_size
@@ -1650,28 +2667,172 @@ class RSS(commands.Cog):
                 log.error("An error has occurred in the RSS cog. Please report it.", exc_info=e)
                 continue
 
+    async def _get_adaptive_wait(self):
+        """Helper for adaptive polling: sweeps happen every minimum interval and only check the feeds that are due."""
+        min_interval = await self.config.adaptive_min_interval()
+        return max(0, min_interval - (time.monotonic() - self._sweep_started))
+
+    async def _run_concurrent_sweep(self, workers: int):
+        """
+        Concurrent scheduler mode for the feed poster loop.
+        Checks everything in the queue through a pool of workers, then waits out the rest of the 5 min window.
+        """
+        sweep_start = time.monotonic()
+
+        queue_items = []
+        while True:
+            queue_item = await self._get_next_in_queue()
+            if not queue_item:
+                break
+            # queue_item is a List of channel_priority: int, total_priority: int, queue_item: SimpleNamespace
+            queue_items.append(queue_item[2])
+
+        if not queue_items:
+            await self._put_feeds_in_queue()
+            if self._post_queue.empty():
+                # nothing to check
+                log.debug("Sleeping, nothing to do")
+                if await self.config.adaptive_polling():
+                    await asyncio.sleep(await self._get_adaptive_wait() or 30)
+                else:
+                    await asyncio.sleep(30)
+            self._post_queue_size = self._post_queue.qsize()
+            return
+
+        host_limiter = HostLimiter(await self.config.scheduler_host_limit())
+        rate_limiter = RateLimiter(await self.config.scheduler_rate_limit())
+
+        # fetching happens in any order, but each feed waits for the feed queued before it
+        # in the same channel to finish posting, keeping the channel_index posting order
+        work_queue = asyncio.Queue()
+        previous_in_channel = {}
+        for rss_feed in queue_items:
+            rss_feed.wait_for = previous_in_channel.get(rss_feed.channel.id, None)
+            rss_feed.done = previous_in_channel[rss_feed.channel.id] = asyncio.Event()
+            work_queue.put_nowait(rss_feed)
+
+        tasks = [
+            asyncio.create_task(self._scheduler_worker(work_queue, host_limiter, rate_limiter))
+            for _ in range(min(workers, len(queue_items)))
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        sweep_time = time.monotonic() - sweep_start
+        self._feed_stats.record_sweep(seconds=sweep_time, feed_count=len(queue_items))
+        log.debug(f"Checked {len(queue_items)} feeds with {len(tasks)} workers in {sweep_time:.1f}s")
+
+        if await self.config.adaptive_polling():
+            wait = await self._get_adaptive_wait()
+        else:
+            wait = max(0, 300 - sweep_time)
+        log.debug(f"Waiting {wait:.1f}s before starting...")
+        await asyncio.sleep(wait)
+        await self._put_feeds_in_queue()
+        self._post_queue_size = self._post_queue.qsize()
+
+    async def _scheduler_worker(self, work_queue: asyncio.Queue, host_limiter: HostLimiter, rate_limiter: RateLimiter):
+        """Helper for the concurrent scheduler: fetch then post queued feeds until the sweep runs out of work."""
+        while True:
+            try:
+                rss_feed = work_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                url = rss_feed.feed_data["url"]
+                validators = self._get_feed_validators(rss_feed.feed_data)
+                feedparser_obj, validators = await self._fetch_feed_for_sweep(
+                    url, validators, host_limiter, rate_limiter
+                )
+
+                if rss_feed.wait_for:
+                    await rss_feed.wait_for.wait()
+                await self.get_current_feed(
+                    rss_feed.channel,
+                    rss_feed.feed_name,
+                    rss_feed.feed_data,
+                    feedparser_obj=feedparser_obj,
+                    validators=validators,
+                )
+            except aiohttp.client_exceptions.InvalidURL:
+                log.debug(f"Feed at {url} is bad or took too long to respond.")
+            except Exception as e:
+                log.error("An error has occurred in the RSS cog. Please report it.", exc_info=e)
+            finally:
+                rss_feed.done.set()
+
     async def _put_feeds_in_queue(self):
         log.debug("Putting feeds in queue")
+        # anything left over from the last sweep is stale now
+        self._sweep_fetches = {}
+        self._sweep_subscribers = {}
+        self._sweep_started = time.monotonic()
         try:
-            config_data = await self.config.all_channels()
-            total_index = 0
-            for channel_id, channel_feed_list in config_data.items():
-                channel = await self._get_channel_object(channel_id)
+            adaptive_polling = await self.config.adaptive_polling()
+            # a feed that becomes due before the next sweep is checked in this one instead of waiting a whole sweep
+            next_sweep = self._sweep_started + await self.config.adaptive_min_interval()
+            sharding = await self.config.sharding()
+            if sharding == "hash":
+                shard_index, shard_count = await self._shards.get_shard()
+            to_queue = []
+            # every feed, including ones in other slices and unusable channels, to tell which leases are dead
+            all_feed_keys = set()
+            current_channel_id = None
+            channel = None
+            channel_index = 0
+            # Red caches this too, but it's still a few awaits per call and most guilds have several feed channels
+            disabled_guilds = {}
+            # feeds come out of the store grouped by channel, in the order they were added
+            async for channel_id, feed_name, feed_data in self._store.iter_feeds():
+                all_feed_keys.add((channel_id, feed_name))
+                if channel_id != current_channel_id:
+                    current_channel_id = channel_id
+                    channel_index = -1
+                    if sharding == "guild" and not self.bot.get_channel(channel_id):
+                        # this channel's guild is handled by another process's gateway shards
+                        channel = None
+                    else:
+                        channel = await self._channels.get_channel(channel_id)
+                    if channel:
+                        guild_id = channel.guild.id
+                        if guild_id not in disabled_guilds:
+                            disabled_guilds[guild_id] = await self.bot.cog_disabled_in_guild(self, channel.guild)
+                        if disabled_guilds[guild_id]:
+                            channel = None
+                channel_index += 1
                 if not channel:
                     continue
 
-                if await self.bot.cog_disabled_in_guild(self, channel.guild):
+                if adaptive_polling and self._feed_due.get((channel_id, feed_name), 0) > next_sweep:
+                    # this feed won't be due until after the next sweep has started
                     continue
-
-                for feed_key, feed in channel_feed_list.items():
-                    for feed_name, feed_data in feed.items():
-                        rss_feed = SimpleNamespace(channel=channel, feed_name=feed_name, feed_data=feed_data)
-                        keys = list(feed.keys())
-                        channel_index = keys.index(feed_name)
-                        total_index += 1
-                        queue_entry = [channel_index, total_index, rss_feed]
-                        log.debug(f"Putting {channel_index}-{total_index}-{channel}-{feed_name} in queue")
-                        await self._post_queue.put(queue_entry)
+                if sharding == "hash":
+                    if self._shards.get_feed_shard(channel_id, feed_name, shard_count) != shard_index:
+                        # another process polls this feed
+                        continue
+                rss_feed = SimpleNamespace(channel=channel, feed_name=feed_name, feed_data=feed_data)
+                to_queue.append((channel_index, rss_feed))
+
+            if sharding == "hash":
+                feed_keys = [(rss_feed.channel.id, rss_feed.feed_name) for _, rss_feed in to_queue]
+                claimed = await self._shards.claim_feeds(feed_keys, shard_index, shard_count, all_feed_keys)
+                to_queue = [
+                    (channel_index, rss_feed)
+                    for (channel_index, rss_feed), feed_key in zip(to_queue, feed_keys)
+                    if feed_key in claimed
+                ]
+
+            for total_index, (channel_index, rss_feed) in enumerate(to_queue, 1):
+                validators = self._get_feed_validators(rss_feed.feed_data)
+                fetch_key = (rss_feed.feed_data["url"], validators["etag"], validators["last_modified"])
+                self._sweep_subscribers[fetch_key] = self._sweep_subscribers.get(fetch_key, 0) + 1
+                queue_entry = [channel_index, total_index, rss_feed]
+                log.debug(f"Putting {channel_index}-{total_index}-{rss_feed.channel}-{rss_feed.feed_name} in queue")
+                await self._post_queue.put(queue_entry)
 
         except Exception as e:
             log.exception(e, exc_info=e)
@@ -1,3 +1,6 @@
+from typing import List
+
+
 class RssFeed():
     """RSS feed object"""
 
@@ -15,6 +18,10 @@ class RssFeed():
         self.embed_color: str = kwargs.get("embed_color", None)
         self.embed_image: str = kwargs.get("embed_image", None)
         self.embed_thumbnail: str = kwargs.get("embed_thumbnail", None)
+        self.etag: str = kwargs.get("etag", None)
+        self.last_modified: str = kwargs.get("last_modified", None)
+        self.poll_interval: int = kwargs.get("poll_interval", None)
+        self.seen_ids: List[str] = kwargs.get("seen_ids", None)
 
     def to_json(self) -> dict:
         return {
@@ -30,6 +37,10 @@ class RssFeed():
             "embed_color": self.embed_color,
             "embed_image": self.embed_image,
             "embed_thumbnail": self.embed_thumbnail,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "poll_interval": self.poll_interval,
+            "seen_ids": self.seen_ids,
         }
 
     @classmethod
@@ -47,4 +58,9 @@ class RssFeed():
             embed_color=data["embed_color"] if data["embed_color"] else None,
             embed_image=data["embed_image"] if data["embed_image"] else None,
             embed_thumbnail=data["embed_thumbnail"] if data["embed_thumbnail"] else None,
+            # cache validators are a get for feeds saved before RSS 1.10.0
+            etag=data.get("etag", None),
+            last_modified=data.get("last_modified", None),
+            poll_interval=data.get("poll_interval", None),
+            seen_ids=data.get("seen_ids", None),
         )
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+
+class HostLimiter:
+    """Caps the number of concurrent fetches against a single website host."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores = {}
+
+    def __call__(self, url: str):
+        """
+        Input:  https://www.website.com/feed
+        Output: the asyncio.Semaphore shared by every url on www.website.com
+        """
+        host = urlparse(url).netloc.lower()
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.limit)
+        return semaphore
+
+
+class RateLimiter:
+    """Spaces out request starts so that no more than `rate` begin per second. A rate of 0 is unlimited."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        # reserve the next free slot before sleeping so that concurrent callers queue up behind each other
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class _HostState:
+    def __init__(self):
+        self.failures = 0
+        self.retry_at = 0.0
+        self.backoff = 0.0
+        self.last_error = None
+
+
+class HostCircuitBreaker:
+    """
+    Tracks consecutive failures per website host.
+
+    After `threshold` failures in a row the host's circuit opens and its feeds are skipped for an exponentially
+    growing backoff. When the backoff runs out, one request is let through as a probe (half-open):
+    a success closes the circuit again and a failure opens it for twice as long.
+    """
+
+    def __init__(self, threshold: int = 3, base_backoff: float = 60.0, max_backoff: float = 6 * 3600.0):
+        self.threshold = threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        # how long a probe request has to finish before another one is let through
+        self.probe_timeout = 60.0
+        self._hosts = {}
+
+    @staticmethod
+    def get_host(url: str):
+        return urlparse(url).netloc.lower()
+
+    def allow(self, url: str):
+        """False if the host's circuit is open. The first call after the backoff runs out is the probe."""
+        state = self._hosts.get(self.get_host(url), None)
+        if state is None or state.failures < self.threshold:
+            return True
+        now = time.monotonic()
+        if now < state.retry_at:
+            return False
+        # half-open: hold everything else back until the probe finishes
+        state.retry_at = now + self.probe_timeout
+        return True
+
+    def record_success(self, url: str):
+        self._hosts.pop(self.get_host(url), None)
+
+    def record_failure(self, url: str, error: str):
+        """Returns the host's consecutive failure count and whether this failure just opened the circuit."""
+        host = self.get_host(url)
+        state = self._hosts.get(host, None)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        state.failures += 1
+        state.last_error = error
+        if state.failures < self.threshold:
+            return state.failures, False
+        state.backoff = min(self.base_backoff * 2 ** (state.failures - self.threshold), self.max_backoff)
+        state.retry_at = time.monotonic() + state.backoff
+        return state.failures, state.failures == self.threshold
+
+    def get_backoff(self, url: str):
+        state = self._hosts.get(self.get_host(url), None)
+        return state.backoff if state else 0.0
+
+    def get_open_circuits(self):
+        """One dict per host with an open circuit, the longest failing first."""
+        now = time.monotonic()
+        circuits = [
+            {
+                "host": host,
+                "failures": state.failures,
+                "retry_in": max(state.retry_at - now, 0.0),
+                "last_error": state.last_error,
+            }
+            for host, state in self._hosts.items()
+            if state.failures >= self.threshold
+        ]
+        return sorted(circuits, key=lambda circuit: circuit["failures"], reverse=True)
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+
+from redbot.core import Config
+
+
+log = logging.getLogger("red.aikaterna.rss")
+
+# a process that hasn't written a heartbeat for this long is treated as gone and its feeds are spread over the rest
+HEARTBEAT_INTERVAL = 60
+WORKER_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+
+# how long to wait before reading a taken-over lease back, to catch another process claiming it at the same time
+CLAIM_SETTLE_SECONDS = 2
+
+
+class ShardCoordinator:
+    """
+    Splits feed polling between several bot processes that share one Config backend.
+
+    Every process writes a heartbeat, and the live processes sorted by id decide which slice of the feeds each one
+    polls, from a stable hash of the channel id and feed name. Adding a process shrinks everyone's slice.
+    A feed is only checked by the process holding its lease. A lease stays valid for as long as its owner keeps
+    writing heartbeats, and a process gives up the leases that moved out of its slice, so a new owner only takes
+    over a feed once the old one has let go of it or stopped, and two processes don't post the same entry
+    while the slices are moving around.
+    Leases are read once per sweep and only written when they change hands.
+    Config has no compare-and-swap, so taken-over leases are read back after a moment to catch a simultaneous claim.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.config.init_custom("RSS_WORKER", 1)
+        self.config.register_custom("RSS_WORKER", heartbeat=0.0)
+        self.config.init_custom("RSS_LEASE", 2)
+        self.config.register_custom("RSS_LEASE", owner=None)
+
+    async def heartbeat(self):
+        await self.config.custom("RSS_WORKER", self.worker_id).heartbeat.set(time.time())
+
+    async def leave(self):
+        await self.config.custom("RSS_WORKER", self.worker_id).clear()
+
+    async def get_live_workers(self):
+        """Ids of every process with a recent heartbeat, sorted. Records from long gone processes are removed."""
+        now = time.time()
+        live_workers = []
+        for worker_id, data in (await self.config.custom("RSS_WORKER").all()).items():
+            if now - data["heartbeat"] < WORKER_TIMEOUT:
+                live_workers.append(worker_id)
+            elif now - data["heartbeat"] > 24 * 3600:
+                await self.config.custom("RSS_WORKER", worker_id).clear()
+        if self.worker_id not in live_workers:
+            live_workers.append(self.worker_id)
+        return sorted(live_workers)
+
+    async def get_shard(self):
+        """Returns (shard index, shard count) for this process."""
+        live_workers = await self.get_live_workers()
+        return live_workers.index(self.worker_id), len(live_workers)
+
+    @staticmethod
+    def get_feed_shard(channel_id: int, feed_name: str, shard_count: int):
+        """The same in every process, unlike hash()."""
+        digest = hashlib.blake2b(f"{channel_id}:{feed_name}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % shard_count
+
+    async def _get_lease_owners(self):
+        """{(channel_id, feed_name): owner} for every lease, in one read."""
+        owners = {}
+        for channel_id, feeds in (await self.config.custom("RSS_LEASE").all()).items():
+            for feed_name, data in feeds.items():
+                owners[(int(channel_id), feed_name)] = data["owner"]
+        return owners
+
+    async def _set_lease_owners(self, feed_keys: list, owner: str):
+        await asyncio.gather(
+            *(
+                self.config.custom("RSS_LEASE", str(channel_id), feed_name).owner.set(owner)
+                for channel_id, feed_name in feed_keys
+            )
+        )
+
+    async def _clear_leases(self, feed_keys: list):
+        await asyncio.gather(
+            *(self.config.custom("RSS_LEASE", str(channel_id), feed_name).clear() for channel_id, feed_name in feed_keys)
+        )
+
+    async def claim_feeds(self, feed_keys: list, shard_index: int, shard_count: int, all_feed_keys: set):
+        """
+        Input:  [(channel_id, feed_name), ...] in this process's slice,
+                shard index and count the slice was made with,
+                set of the keys of every feed that exists, for removing the leases of deleted feeds
+        Output: set of the feed keys this process holds the lease for
+        """
+        live_workers = set(await self.get_live_workers())
+        owners = await self._get_lease_owners()
+
+        # feeds that moved to another process's slice are handed over, and leases of deleted feeds are dropped
+        released = [
+            feed_key
+            for feed_key, owner in owners.items()
+            if feed_key not in all_feed_keys
+            or (owner == self.worker_id and self.get_feed_shard(*feed_key, shard_count) != shard_index)
+        ]
+
+        claimed = set()
+        taken_over = []
+        for feed_key in feed_keys:
+            owner = owners.get(feed_key, None)
+            if owner == self.worker_id:
+                claimed.add(feed_key)
+            elif owner is None or owner not in live_workers:
+                taken_over.append(feed_key)
+            else:
+                log.debug(f"Feed {feed_key[1]} on cid {feed_key[0]} is still leased to {owner}")
+
+        if released:
+            await self._clear_leases(released)
+        if taken_over:
+            await self._set_lease_owners(taken_over, self.worker_id)
+            await asyncio.sleep(CLAIM_SETTLE_SECONDS)
+            owners = await self._get_lease_owners()
+            claimed.update(feed_key for feed_key in taken_over if owners.get(feed_key, None) == self.worker_id)
+        return claimed
+
+    async def release_feed(self, channel_id: int, feed_name: str):
+        """Drop a deleted feed's lease right away."""
+        await self._clear_leases([(channel_id, feed_name)])
@@ -0,0 +1,102 @@
+import re
+from collections.abc import Mapping
+
+
+# $summary_plaintext, $tags_plaintext01, etc. are built from the $summary and $tags source tags
+PLAINTEXT_TAG_RE = re.compile(r"^(?P<source>.+?)_plaintext(\d{2})?$")
+
+# tags that are built without any html parsing, these are added by every partial build
+CHEAP_TAGS = [
+    "image_plaintext",
+    "media_content_plaintext",
+    "media_thumbnail_plaintext",
+    "updated_parsed_datetime",
+    "published_parsed_datetime",
+]
+
+
+class LazyTagMapping(Mapping):
+    """
+    Read-only mapping of a feed entry's template tags.
+
+    The extra bs4-discovered tags are only built for the tags that are looked up,
+    iterating over the mapping builds every tag.
+    """
+
+    def __init__(self, entry, build_tags):
+        """
+        entry:      a feedparser entry
+        build_tags: callable(entry, only_tags) that returns a copy of the entry with extra tags added,
+                    only_tags is a set of source tag names or None to build every tag
+        """
+        self._entry = entry
+        self._build_tags = build_tags
+        self._tags = entry
+        self._built_sources = None
+        self._fully_built = False
+
+    @property
+    def entry(self):
+        """The feedparser entry without any extra tags."""
+        return self._entry
+
+    def sources_for(self, tag_names):
+        """
+        Input:  tag names without the $
+        Output: set of source tags needed to build them, or None if every tag needs to be built
+        """
+        sources = set()
+        for tag_name in tag_names:
+            if not isinstance(tag_name, str) or tag_name in self._entry or tag_name in CHEAP_TAGS:
+                continue
+            if tag_name in ["tags_list", "tags_plaintext_list"]:
+                # collected from the terms of every list tag
+                sources.update(name for name, content in self._entry.items() if isinstance(content, list))
+                continue
+            plaintext_match = PLAINTEXT_TAG_RE.match(tag_name)
+            if plaintext_match and plaintext_match.group("source") in self._entry:
+                sources.add(plaintext_match.group("source"))
+                continue
+            # $content_image01 and friends come from the last html tag in the entry, along with
+            # anything that doesn't look like a generated tag: fall back to building everything
+            return None
+        return sources
+
+    def is_built(self, sources):
+        if self._fully_built:
+            return True
+        if sources is None or self._built_sources is None:
+            return False
+        return sources <= self._built_sources
+
+    def build(self, sources):
+        """Blocking, build the tags for the given sources. Earlier partial builds are included again."""
+        if sources is None:
+            self._tags = self._build_tags(self._entry, None)
+            self._fully_built = True
+            return
+        if self._built_sources is not None:
+            sources = sources | self._built_sources
+        self._tags = self._build_tags(self._entry, sources)
+        self._built_sources = sources
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        if key in self._tags:
+            return self._tags[key]
+        if not self._fully_built:
+            sources = self.sources_for([key])
+            if not self.is_built(sources):
+                self.build(sources)
+        return self._tags[key]
+
+    def __iter__(self):
+        if not self._fully_built:
+            self.build(None)
+        return iter(self._tags)
+
+    def __len__(self):
+        if not self._fully_built:
+            self.build(None)
+        return len(self._tags)
@@ -0,0 +1,88 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+# changes up to this many are inserted in place, more than this rebuild the arrays in one go
+_INPLACE_LIMIT = 256
+
+
+class GuildActivityIndex:
+    """
+    Last seen times for one guild's members, kept in flat arrays instead of a dict per member.
+
+    member_ids is sorted with seen_times alongside it, for looking up a member,
+    and sorted_times holds the same timestamps in order, so that "how many members were seen
+    before/after" is a binary search.
+    """
+
+    __slots__ = ("member_ids", "seen_times", "sorted_times")
+
+    def __init__(self):
+        self.member_ids = array("Q")
+        self.seen_times = array("I")
+        self.sorted_times = array("I")
+
+    def __len__(self):
+        return len(self.member_ids)
+
+    def get(self, member_id: int):
+        i = bisect_left(self.member_ids, member_id)
+        if i < len(self.member_ids) and self.member_ids[i] == member_id:
+            return self.seen_times[i]
+        return None
+
+    def update(self, seen: dict):
+        """Merge in {member id: seen timestamp}, keeping the later time for members already in the index."""
+        removed_times = []
+        added_times = []
+        new_members = []
+        for member_id, seen_time in seen.items():
+            i = bisect_left(self.member_ids, member_id)
+            if i < len(self.member_ids) and self.member_ids[i] == member_id:
+                if self.seen_times[i] >= seen_time:
+                    continue
+                removed_times.append(self.seen_times[i])
+                self.seen_times[i] = seen_time
+            else:
+                new_members.append((member_id, seen_time))
+            added_times.append(seen_time)
+
+        if new_members:
+            self._add_members(new_members)
+        if added_times:
+            self._update_sorted_times(removed_times, added_times)
+
+    def remove(self, member_id: int):
+        i = bisect_left(self.member_ids, member_id)
+        if i < len(self.member_ids) and self.member_ids[i] == member_id:
+            seen_time = self.seen_times[i]
+            del self.member_ids[i]
+            del self.seen_times[i]
+            del self.sorted_times[bisect_left(self.sorted_times, seen_time)]
+
+    def count_seen_before(self, timestamp: int):
+        return bisect_left(self.sorted_times, timestamp)
+
+    def count_seen_since(self, timestamp: int):
+        return len(self.sorted_times) - bisect_left(self.sorted_times, timestamp)
+
+    def _add_members(self, new_members: list):
+        if len(new_members) <= _INPLACE_LIMIT:
+            for member_id, seen_time in new_members:
+                i = bisect_right(self.member_ids, member_id)
+                self.member_ids.insert(i, member_id)
+                self.seen_times.insert(i, seen_time)
+            return
+        members = list(zip(self.member_ids, self.seen_times))
+        members.extend(new_members)
+        members.sort()
+        self.member_ids = array("Q", (member_id for member_id, _ in members))
+        self.seen_times = array("I", (seen_time for _, seen_time in members))
+
+    def _update_sorted_times(self, removed_times: list, added_times: list):
+        if len(added_times) > _INPLACE_LIMIT:
+            self.sorted_times = array("I", sorted(self.seen_times))
+            return
+        for seen_time in removed_times:
+            del self.sorted_times[bisect_left(self.sorted_times, seen_time)]
+        for seen_time in added_times:
+            self.sorted_times.insert(bisect_right(self.sorted_times, seen_time), seen_time)
@@ -0,0 +1,54 @@
+from array import array
+
+
+class EventBuffer:
+    """
+    Fixed-size ring of (guild id, user id) pairs that the gateway listeners push into.
+
+    The ring is allocated once and emptied completely on every drain, so pushing an event is
+    two array writes with no allocation. Events pushed while the ring is full are dropped and counted.
+    """
+
+    __slots__ = ("capacity", "_guild_ids", "_user_ids", "_head", "_size", "received", "coalesced", "dropped")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._guild_ids = array("Q", bytes(8 * capacity))
+        self._user_ids = array("Q", bytes(8 * capacity))
+        self._head = 0
+        self._size = 0
+        # totals since the cog was loaded
+        self.received = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, guild_id: int, user_id: int):
+        """Returns False if the ring is full and the event was dropped."""
+        self.received += 1
+        if self._size == self.capacity:
+            self.dropped += 1
+            return False
+        i = (self._head + self._size) % self.capacity
+        self._guild_ids[i] = guild_id
+        self._user_ids[i] = user_id
+        self._size += 1
+        return True
+
+    def drain(self):
+        """Empty the ring, returning the distinct (guild id, user id) pairs that were in it."""
+        if not self._size:
+            return set()
+        end = self._head + self._size
+        if end <= self.capacity:
+            pairs = set(zip(self._guild_ids[self._head : end], self._user_ids[self._head : end]))
+        else:
+            end -= self.capacity
+            pairs = set(zip(self._guild_ids[self._head :], self._user_ids[self._head :]))
+            pairs.update(zip(self._guild_ids[:end], self._user_ids[:end]))
+        self.coalesced += self._size - len(pairs)
+        self._head = end % self.capacity
+        self._size = 0
+        return pairs
@@ -1,15 +1,32 @@
 import asyncio
 import contextlib
 import datetime
+import logging
 from typing import Union, Literal
 
 import discord
 import time
 
-from redbot.core import Config, commands
+from redbot.core import Config, checks, commands
+from redbot.core.drivers import JsonDriver
+
+from .activity_index import GuildActivityIndex
+from .event_buffer import EventBuffer
+
+log = logging.getLogger("red.aikaterna.seen")
 
 _SCHEMA_VERSION = 2
 
+# seen times are saved every FLUSH_INTERVAL seconds, or sooner once MAX_DIRTY members are waiting
+FLUSH_INTERVAL = 60
+MAX_DIRTY = 1000
+# members written at the same time on drivers that save single keys
+WRITE_BATCH_SIZE = 100
+
+# listener events are queued in a ring this big and moved into the cache every DRAIN_INTERVAL seconds
+EVENT_BUFFER_SIZE = 65536
+DRAIN_INTERVAL = 1
+
 
 class Seen(commands.Cog):
     """Shows last time a user was seen in chat."""
@@ -22,6 +39,9 @@ class Seen(commands.Cog):
             for guild_id, members in data.items():
                 if user_id in members:
                     await self.config.member_from_ids(guild_id, user_id).clear()
+            for guild_id, index in self._index.items():
+                index.remove(user_id)
+                self._cache.get(guild_id, {}).pop(user_id, None)
 
     def __init__(self, bot):
         self.bot = bot
@@ -33,13 +53,41 @@ class Seen(commands.Cog):
         self.config.register_global(**default_global)
         self.config.register_member(**default_member)
 
+        # guild id: {member id: seen}, only the members seen since the last save
         self._cache = {}
+        self._dirty_count = 0
+        self._flush_now = asyncio.Event()
+        # members being saved right now, still looked up by [p]seen until the save is done
+        self._flushing = {}
+        # guild id: GuildActivityIndex of every member's last seen time, for the activity counts
+        self._index = {}
+        self._index_ready = False
+        # (guild id, user id) of every event since the last drain
+        self._events = EventBuffer(EVENT_BUFFER_SIZE)
+        self._drain_task = self.bot.loop.create_task(self._drain_loop())
         self._task = self.bot.loop.create_task(self._save_to_config())
 
     async def initialize(self):
-        asyncio.ensure_future(
-            self._migrate_config(from_version=await self.config.schema_version(), to_version=_SCHEMA_VERSION)
-        )
+        asyncio.ensure_future(self._initialize(from_version=await self.config.schema_version()))
+
+    async def _initialize(self, from_version: int):
+        await self._migrate_config(from_version=from_version, to_version=_SCHEMA_VERSION)
+        await self._load_index()
+
+    async def _load_index(self):
+        """Read every saved seen time once, after that the index is kept up to date by each save."""
+        all_members = await self.config.all_members()
+        for guild_id, members in all_members.items():
+            seen = {member_id: data["seen"] for member_id, data in members.items() if data.get("seen")}
+            self._get_index(guild_id).update(seen)
+        del all_members
+        self._index_ready = True
+
+    def _get_index(self, guild_id: int):
+        index = self._index.get(guild_id, None)
+        if index is None:
+            index = self._index[guild_id] = GuildActivityIndex()
+        return index
 
     async def _migrate_config(self, from_version: int, to_version: int):
         if from_version == to_version:
@@ -78,8 +126,11 @@ class Seen(commands.Cog):
     @commands.bot_has_permissions(embed_links=True)
     async def _seen(self, ctx, author: discord.Member):
         """Shows last time a user was seen in chat."""
+        self._drain_events()
         member_seen_config = await self.config.member(author).seen()
         member_seen_cache = self._cache.get(author.guild.id, {}).get(author.id, None)
+        if not member_seen_cache:
+            member_seen_cache = self._flushing.get(author.guild.id, {}).get(author.id, None)
 
         if not member_seen_cache and not member_seen_config:
             embed = discord.Embed(colour=discord.Color.red(), title="I haven't seen that user yet.")
@@ -121,6 +172,56 @@ class Seen(commands.Cog):
         em.set_author(name="{} was seen {}".format(author.display_name, ts), icon_url=avatar)
         await ctx.send(embed=em)
 
+    @checks.mod_or_permissions(manage_guild=True)
+    @commands.guild_only()
+    @commands.group(name="seencount")
+    async def _seencount(self, ctx):
+        """Count members by when they were last seen in chat."""
+        pass
+
+    @_seencount.command(name="inactive")
+    async def _seencount_inactive(self, ctx, days: int):
+        """How many members haven't been seen for more than this many days."""
+        if days <= 0:
+            return await ctx.send("The number of days must be at least 1.")
+        count = await self._count_seen(ctx, before=int(time.time()) - days * 86400)
+        if count is not None:
+            await ctx.send(f"{count} member(s) haven't been seen in chat for more than {days} day(s).")
+
+    @_seencount.command(name="active")
+    async def _seencount_active(self, ctx, hours: int):
+        """How many members have been seen in the last this many hours."""
+        if hours <= 0:
+            return await ctx.send("The number of hours must be at least 1.")
+        count = await self._count_seen(ctx, since=int(time.time()) - hours * 3600)
+        if count is not None:
+            await ctx.send(f"{count} member(s) have been seen in chat in the last {hours} hour(s).")
+
+    async def _count_seen(self, ctx, *, before: int = None, since: int = None):
+        """Helper for seencount: counts only members that have been seen at least once."""
+        if not self._index_ready:
+            await ctx.send("I'm still loading the seen times, try again in a moment.")
+            return None
+        self._drain_events()
+        index = self._get_index(ctx.guild.id)
+        # members seen since the last save aren't in the index yet
+        index.update(self._cache.get(ctx.guild.id, {}))
+        if before is not None:
+            return index.count_seen_before(before)
+        return index.count_seen_since(since)
+
+    @checks.is_owner()
+    @commands.command(name="seenstats")
+    async def _seenstats(self, ctx):
+        """Show how many listener events the cog has handled."""
+        events = self._events
+        msg = (
+            f"{events.received} events received, {events.coalesced} coalesced with an earlier event "
+            f"from the same member and {events.dropped} dropped because the buffer was full.\n"
+            f"{len(events)} events waiting, {self._dirty_count} members waiting to be saved."
+        )
+        await ctx.send(msg)
+
     @staticmethod
     def _dynamic_time(time_elapsed):
         m, s = divmod(time_elapsed, 60)
@@ -131,67 +232,119 @@ class Seen(commands.Cog):
     @commands.Cog.listener()
     async def on_message(self, message):
         if getattr(message, "guild", None):
-            if message.guild.id not in self._cache:
-                self._cache[message.guild.id] = {}
-            self._cache[message.guild.id][message.author.id] = int(time.time())
+            self._events.push(message.guild.id, message.author.id)
 
     @commands.Cog.listener()
     async def on_typing(
         self, channel: discord.abc.Messageable, user: Union[discord.User, discord.Member], when: datetime.datetime,
     ):
         if getattr(user, "guild", None):
-            if user.guild.id not in self._cache:
-                self._cache[user.guild.id] = {}
-            self._cache[user.guild.id][user.id] = int(time.time())
+            self._events.push(user.guild.id, user.id)
 
     @commands.Cog.listener()
     async def on_message_edit(self, before: discord.Message, after: discord.Message):
         if getattr(after, "guild", None):
-            if after.guild.id not in self._cache:
-                self._cache[after.guild.id] = {}
-            self._cache[after.guild.id][after.author.id] = int(time.time())
+            self._events.push(after.guild.id, after.author.id)
 
     @commands.Cog.listener()
     async def on_reaction_remove(self, reaction: discord.Reaction, user: Union[discord.Member, discord.User]):
         if getattr(user, "guild", None):
-            if user.guild.id not in self._cache:
-                self._cache[user.guild.id] = {}
-            self._cache[user.guild.id][user.id] = int(time.time())
+            self._events.push(user.guild.id, user.id)
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction: discord.Reaction, user: Union[discord.Member, discord.User]):
         if getattr(user, "guild", None):
-            if user.guild.id not in self._cache:
-                self._cache[user.guild.id] = {}
-            self._cache[user.guild.id][user.id] = int(time.time())
+            self._events.push(user.guild.id, user.id)
+
+    def _drain_events(self):
+        """Move the queued events into the cache, all of them stamped with the same time."""
+        seen_time = int(time.time())
+        for guild_id, user_id in self._events.drain():
+            self._mark_seen(guild_id, user_id, seen_time)
+
+    async def _drain_loop(self):
+        with contextlib.suppress(asyncio.CancelledError):
+            while True:
+                self._drain_events()
+                await asyncio.sleep(DRAIN_INTERVAL)
+
+    def _mark_seen(self, guild_id: int, user_id: int, seen_time: int):
+        guild_cache = self._cache.get(guild_id, None)
+        if guild_cache is None:
+            guild_cache = self._cache[guild_id] = {}
+        if user_id not in guild_cache:
+            self._dirty_count += 1
+            if self._dirty_count >= MAX_DIRTY:
+                self._flush_now.set()
+        guild_cache[user_id] = seen_time
 
     def cog_unload(self):
         self.bot.loop.create_task(self._clean_up())
 
     async def _clean_up(self):
+        if self._drain_task:
+            self._drain_task.cancel()
         if self._task:
             self._task.cancel()
-        if self._cache:
-            group = self.config._get_base_group(self.config.MEMBER)  # Bulk update to config
-            async with group.all() as new_data:
-                for guild_id, member_data in self._cache.items():
-                    if str(guild_id) not in new_data:
-                        new_data[str(guild_id)] = {}
-                    for member_id, seen in member_data.items():
-                        new_data[str(guild_id)][str(member_id)] = {"seen": seen}
+        self._drain_events()
+        await self._flush()
 
-    async def _save_to_config(self):
-        await self.bot.wait_until_ready()
-        with contextlib.suppress(asyncio.CancelledError):
-            while True:
-                users_data = self._cache.copy()
-                self._cache = {}
-                group = self.config._get_base_group(self.config.MEMBER)  # Bulk update to config
+    async def _flush(self):
+        """Save the members seen since the last save. Returns False if the save failed."""
+        if not self._cache:
+            return True
+        users_data = self._flushing = self._cache
+        self._cache = {}
+        self._dirty_count = 0
+        self._flush_now.clear()
+
+        for guild_id, member_data in users_data.items():
+            self._get_index(guild_id).update(member_data)
+
+        group = self.config._get_base_group(self.config.MEMBER)
+        try:
+            if isinstance(self.config.driver, JsonDriver):
+                # the json driver rewrites the whole file on every set, so one bulk update is the cheapest write
                 async with group.all() as new_data:
                     for guild_id, member_data in users_data.items():
                         if str(guild_id) not in new_data:
                             new_data[str(guild_id)] = {}
                         for member_id, seen in member_data.items():
                             new_data[str(guild_id)][str(member_id)] = {"seen": seen}
+            else:
+                # the other drivers write just the keys that are set, a batch of members at a time
+                writes = [
+                    (str(guild_id), str(member_id), seen)
+                    for guild_id, member_data in users_data.items()
+                    for member_id, seen in member_data.items()
+                ]
+                for i in range(0, len(writes), WRITE_BATCH_SIZE):
+                    await asyncio.gather(
+                        *(
+                            group.set_raw(guild_id, member_id, value={"seen": seen})
+                            for guild_id, member_id, seen in writes[i : i + WRITE_BATCH_SIZE]
+                        )
+                    )
+        except Exception:
+            log.error("Failed to save seen times, they will be tried again on the next save.", exc_info=True)
+            self._requeue(users_data)
+            return False
+        finally:
+            self._flushing = {}
+        return True
+
+    def _requeue(self, users_data: dict):
+        """Put members whose save failed back in the cache, unless they've been seen again since."""
+        for guild_id, member_data in users_data.items():
+            for member_id, seen in member_data.items():
+                self._mark_seen(guild_id, member_id, max(seen, self._cache.get(guild_id, {}).get(member_id, 0)))
 
-                await asyncio.sleep(60)
+    async def _save_to_config(self):
+        await self.bot.wait_until_ready()
+        with contextlib.suppress(asyncio.CancelledError):
+            while True:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._flush_now.wait(), timeout=FLUSH_INTERVAL)
+                if not await self._flush():
+                    # don't retry straight away because the dirty count is still over the limit
+                    await asyncio.sleep(FLUSH_INTERVAL)
@@ -1,16 +1,71 @@
 import asyncio
 import aiohttp
+import codecs
 import logging
 from urllib.parse import urlparse
 
-from redbot.core import checks, commands
+from redbot.core import checks, commands, Config
 from redbot.core.utils.chat_formatting import box, pagify
 from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
 log = logging.getLogger("red.aikaterna.urlfetch")
 
 
-__version__ = "1.1.0"
+__version__ = "1.2.0"
+
+
+# a copy of the helpers in rss/fetch.py, cogs are installed one folder at a time so they can't share a module
+# content types that can't be read as text
+BINARY_CONTENT_TYPES = [
+    "application/gzip",
+    "application/pdf",
+    "application/x-tar",
+    "application/zip",
+    "audio/",
+    "font/",
+    "image/",
+    "video/",
+]
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ContentRejected(Exception):
+    def __init__(self, m):
+        self.message = m
+
+    def __str__(self):
+        return self.message
+
+
+def check_response_headers(resp: aiohttp.ClientResponse, max_size: int, *, allowed_types: list = None):
+    """
+    Reject a response before reading the body, based on its Content-Type and Content-Length headers.
+    allowed_types is a list of content type prefixes that are always accepted, like ["image/"] for images.
+    max_size is in bytes, 0 is unlimited.
+    """
+    content_type = resp.content_type.lower()
+    allowed = allowed_types and any(content_type.startswith(allowed_type) for allowed_type in allowed_types)
+    if not allowed and any(content_type.startswith(binary_type) for binary_type in BINARY_CONTENT_TYPES):
+        raise ContentRejected(f"The url returned `{content_type}` content, which can't be read as text.")
+    if max_size and resp.content_length and resp.content_length > max_size:
+        raise ContentRejected(
+            f"The url returned {resp.content_length} bytes of content, which is over the {max_size} byte limit."
+        )
+
+
+async def iter_limited(resp: aiohttp.ClientResponse, max_size: int, *, allowed_types: list = None):
+    """
+    Yield the response body in chunks, stopping with ContentRejected as soon as it goes over max_size bytes.
+    The Content-Length header can be missing or wrong, so the limit is checked against what was actually read.
+    """
+    check_response_headers(resp, max_size, allowed_types=allowed_types)
+    size = 0
+    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+        size += len(chunk)
+        if max_size and size > max_size:
+            raise ContentRejected(f"The url returned more than the {max_size} byte content limit.")
+        yield chunk
 
 
 class UrlFetch(commands.Cog):
@@ -18,8 +73,14 @@ class UrlFetch(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.config = Config.get_conf(self, identifier=2711759130, force_registration=True)
+        self.config.register_global(max_size=512 * 1024)
 
         self._headers = {'User-Agent': 'Python/3.8'}
+        self._session = aiohttp.ClientSession(headers=self._headers, timeout=aiohttp.ClientTimeout(total=20))
+
+    def cog_unload(self):
+        self.bot.loop.create_task(self._session.close())
 
     async def red_delete_data_for_user(self, **kwargs):
         """Nothing to delete"""
@@ -31,36 +92,61 @@ class UrlFetch(commands.Cog):
         Input a URL to read.
         """
         async with ctx.typing():
-            valid_url = await self._valid_url(ctx, url)
-            if valid_url:
-                text = await self._get_url_content(url)
-                if text:
-                    page_list = []
-                    for page in pagify(text, delims=["\n"], page_length=1800):
-                        page_list.append(box(page))
-                    if len(page_list) == 1:
-                        await ctx.send(box(page))
-                    else:
-                        await menu(ctx, page_list, DEFAULT_CONTROLS)
+            text = await self._valid_url(ctx, url)
+            if text:
+                page_list = []
+                for page in pagify(text, delims=["\n"], page_length=1800):
+                    page_list.append(box(page))
+                if len(page_list) == 1:
+                    await ctx.send(box(page))
+                else:
+                    await menu(ctx, page_list, DEFAULT_CONTROLS)
             else:
                 return
 
+    @checks.is_owner()
+    @commands.command()
+    async def urlfetchsize(self, ctx, kilobytes: int):
+        """
+        Set the largest page, in kilobytes, that urlfetch will download. Use 0 for unlimited.
+
+        Defaults to 512.
+        """
+        if kilobytes < 0:
+            return await ctx.send("The size limit cannot be less than zero.")
+        await self.config.max_size.set(kilobytes * 1024)
+        if kilobytes:
+            await ctx.send(f"Pages over {kilobytes} KB will no longer be fetched.")
+        else:
+            await ctx.send("Fetched pages are no longer size limited.")
+
     async def _get_url_content(self, url: str):
+        """Returns (text, error message)."""
         try:
-            timeout = aiohttp.ClientTimeout(total=20)
-            async with aiohttp.ClientSession(headers=self._headers, timeout=timeout) as session:
-                async with session.get(url) as resp:
-                    text = await resp.text()
-            return text
+            max_size = await self.config.max_size()
+            async with self._session.get(url) as resp:
+                # decode as the chunks arrive instead of holding the whole body in memory twice
+                try:
+                    decoder = codecs.getincrementaldecoder(resp.charset or "utf-8")(errors="replace")
+                except LookupError:
+                    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                text_parts = []
+                async for chunk in iter_limited(resp, max_size):
+                    text_parts.append(decoder.decode(chunk))
+                text_parts.append(decoder.decode(b"", final=True))
+            return "".join(text_parts), None
+        except ContentRejected as e:
+            log.info(f"Content rejected at url:\n\t{url}\n\t{e}")
+            return None, str(e)
         except aiohttp.client_exceptions.ClientConnectorError:
             log.error(f"aiohttp failure accessing site at url:\n\t{url}", exc_info=True)
-            return None
+            return None, None
         except asyncio.exceptions.TimeoutError:
             log.error(f"asyncio timeout while accessing feed at url:\n\t{url}")
-            return None
+            return None, None
         except Exception:
             log.error(f"General failure accessing site at url:\n\t{url}", exc_info=True)
-            return None
+            return None, None
 
     async def _valid_url(self, ctx, url: str):
         try:
@@ -71,7 +157,10 @@ class UrlFetch(commands.Cog):
             return None
 
         if all([result.scheme, result.netloc]):
-            text = await self._get_url_content(url)
+            text, error_msg = await self._get_url_content(url)
+            if error_msg:
+                await ctx.send(error_msg)
+                return None
             if not text:
                 await ctx.send("No text present at the given url.")
                 return None
@@ -3,4 +3,5 @@ from .voicelogs import VoiceLogs
 
 async def setup(bot):
     cog = VoiceLogs(bot)
+    await cog.initialize()
     bot.add_cog(cog)
@@ -0,0 +1,151 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+JOIN = "join"
+LEAVE = "leave"
+
+
+class VoiceJournal:
+    """
+    Append-only log of voice channel joins and leaves in a local SQLite database.
+
+    A leave row carries the time of the join it closes, so a finished session is a single row
+    and history is read straight from the leave rows. Join rows are only needed to find the sessions
+    that were still open when the bot stopped.
+    All database work runs on a single background thread so the event loop is never blocked on disk.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voice_journal")
+        self._conn = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        await self._run(self._open)
+
+    def _open(self):
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS voice_events ("
+                "user_id INTEGER NOT NULL, "
+                "channel_id INTEGER NOT NULL, "
+                "channel_name TEXT NOT NULL, "
+                "event TEXT NOT NULL, "
+                "at REAL NOT NULL, "
+                "joined_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS voice_events_user ON voice_events (user_id, joined_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS voice_events_channel ON voice_events (channel_id, joined_at)")
+            # time ordered, so that expiring old rows only visits the rows being removed
+            self._conn.execute("CREATE INDEX IF NOT EXISTS voice_events_time ON voice_events (event, at)")
+
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+
+    async def append(self, rows: list):
+        """rows are (user_id, channel_id, channel_name, event, at, joined_at), joined_at is None for joins."""
+        await self._run(self._append, rows)
+
+    def _append(self, rows: list):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO voice_events (user_id, channel_id, channel_name, event, at, joined_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    async def delete_joins(self, sessions: list):
+        """
+        Delete the join rows of sessions that will never get a leave.
+        sessions are (user_id, channel_id, joined_at).
+        """
+        await self._run(self._delete_joins, sessions)
+
+    def _delete_joins(self, sessions: list):
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM voice_events WHERE event = ? AND user_id = ? AND channel_id = ? AND at = ?",
+                [(JOIN, user_id, channel_id, joined_at) for user_id, channel_id, joined_at in sessions],
+            )
+
+    async def get_open_sessions(self):
+        """Joins without a leave after them, as {user_id: {channel_id: (channel_name, joined_at)}}."""
+        return await self._run(self._get_open_sessions)
+
+    def _get_open_sessions(self):
+        rows = self._conn.execute(
+            "SELECT j.user_id, j.channel_id, j.channel_name, j.at FROM voice_events j "
+            "WHERE j.event = ? AND NOT EXISTS ("
+            "SELECT 1 FROM voice_events l WHERE l.event = ? AND l.user_id = j.user_id "
+            "AND l.channel_id = j.channel_id AND l.joined_at = j.at)",
+            (JOIN, LEAVE),
+        ).fetchall()
+        open_sessions = {}
+        for user_id, channel_id, channel_name, joined_at in rows:
+            open_sessions.setdefault(user_id, {})[channel_id] = (channel_name, joined_at)
+        return open_sessions
+
+    async def get_user_sessions(self, user_id: int, limit: int):
+        """The user's latest finished sessions, newest first."""
+        return await self._run(self._get_sessions, "user_id", user_id, limit)
+
+    async def get_channel_sessions(self, channel_id: int, limit: int):
+        """The channel's latest finished sessions, newest first."""
+        return await self._run(self._get_sessions, "channel_id", channel_id, limit)
+
+    def _get_sessions(self, column: str, value: int, limit: int):
+        rows = self._conn.execute(
+            f"SELECT user_id, channel_id, channel_name, joined_at, at FROM voice_events "
+            f"WHERE {column} = ? AND event = ? ORDER BY joined_at DESC LIMIT ?",
+            (value, LEAVE, limit),
+        ).fetchall()
+        return [
+            {"user_id": user_id, "channel_id": channel_id, "channel_name": name, "joined_at": joined_at, "left_at": at}
+            for user_id, channel_id, name, joined_at, at in rows
+        ]
+
+    async def get_channel_sessions_since(self, channel_id: int, timestamp: float):
+        """(user_id, joined_at, left_at) of the channel's finished sessions that ended after timestamp."""
+        return await self._run(self._get_channel_sessions_since, channel_id, timestamp)
+
+    def _get_channel_sessions_since(self, channel_id: int, timestamp: float):
+        return self._conn.execute(
+            "SELECT user_id, joined_at, at FROM voice_events WHERE channel_id = ? AND event = ? AND at > ?",
+            (channel_id, LEAVE, timestamp),
+        ).fetchall()
+
+    async def delete_before(self, timestamp: float):
+        """
+        Delete every row from before timestamp: sessions that ended before it, and joins from before it.
+        A join that old without a leave is a session that was never closed, it's expired as well.
+        Returns the number of rows deleted.
+        """
+        return await self._run(self._delete_before, timestamp)
+
+    def _delete_before(self, timestamp: float):
+        with self._conn:
+            joins = self._conn.execute("DELETE FROM voice_events WHERE event = ? AND at < ?", (JOIN, timestamp))
+            leaves = self._conn.execute("DELETE FROM voice_events WHERE event = ? AND at < ?", (LEAVE, timestamp))
+        return joins.rowcount + leaves.rowcount
+
+    async def delete_user(self, user_id: int):
+        await self._run(self._delete_user, user_id)
+
+    def _delete_user(self, user_id: int):
+        with self._conn:
+            self._conn.execute("DELETE FROM voice_events WHERE user_id = ?", (user_id,))
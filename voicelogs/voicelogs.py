@@ -4,6 +4,7 @@
 import asyncio
 import contextlib
 import discord
+import heapq
 import logging
 
 from datetime import date, datetime, timedelta, timezone
@@ -11,8 +12,11 @@ from types import SimpleNamespace
 from typing import Literal, Union
 
 from redbot.core import checks, commands, Config
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.chat_formatting import bold
 
+from .journal import JOIN, LEAVE, VoiceJournal
+
 
 log = logging.getLogger("red.aikaterna.voicelogs")
 
@@ -21,7 +25,7 @@ class VoiceLogs(commands.Cog):
     """Logs information about voice channel connection times."""
 
     __author__ = ["ZeLarpMaster#0818", "aikaterna"]
-    __version__ = "0.1.1"
+    __version__ = "0.2.0"
 
     TIME_FORMATS = ["{} seconds", "{} minutes", "{} hours", "{} days", "{} weeks"]
     TIME_FRACTIONS = [60, 60, 24, 7]
@@ -35,24 +39,127 @@ class VoiceLogs(commands.Cog):
         user_id: int,
     ):
         await self.config.user_from_id(user_id).clear()
+        await self._ready.wait()
+        for channel_id in list(self._open_sessions.get(user_id, {})):
+            self._close_session(user_id, channel_id)
+        await self.journal.delete_user(user_id)
 
     def __init__(self, bot):
         self.bot = bot
         self.config = Config.get_conf(self, 2708181003, force_registration=True)
 
+        default_global = {"journal_migrated": False}
         default_guild = {"toggle": False}
         default_user = {"history": []}
 
-        #    history is a list of dict entries
+        #    history is a list of dict entries, only read once to move it into the journal
         #    {"channel_id": int,
         #    "channel_name": str,
         #    "joined_at": datetime,
         #    "left_at": datetime}
 
+        self.config.register_global(**default_global)
         self.config.register_guild(**default_guild)
         self.config.register_user(**default_user)
 
-        asyncio.ensure_future(self.cleanup_loop())
+        # joins and leaves are appended to the journal, and the sessions still going on are kept here
+        # as {user_id: {channel_id: (channel_name, joined_at)}}
+        self.journal = VoiceJournal(cog_data_path(self) / "voice_journal.db")
+        self._open_sessions = {}
+        # the same open sessions by channel, {channel_id: {user_id: joined_at}}
+        self._channel_sessions = {}
+        self._ready = asyncio.Event()
+        self._reconcile_task = None
+
+        self._cleanup_task = asyncio.ensure_future(self.cleanup_loop())
+
+    async def initialize(self):
+        await self.journal.open()
+        if not await self.config.journal_migrated():
+            await self._migrate_history()
+        self._open_sessions = await self.journal.get_open_sessions()
+        for user_id, sessions in self._open_sessions.items():
+            for channel_id, (_, joined_at) in sessions.items():
+                self._channel_sessions.setdefault(channel_id, {})[user_id] = joined_at
+        # the voice states to compare against aren't there until the bot has connected
+        self._reconcile_task = asyncio.ensure_future(self._reconcile_sessions())
+
+    async def _reconcile_sessions(self):
+        """
+        Match the open sessions from the journal against who is actually connected.
+
+        Sessions whose leave was missed while the bot was offline are dropped, since there's no telling how long
+        they lasted, and users who joined while the bot was offline get a session starting now.
+        """
+        try:
+            await self.bot.wait_until_red_ready()
+            stale = []
+            for user_id, sessions in list(self._open_sessions.items()):
+                for channel_id, (_, joined_at) in list(sessions.items()):
+                    if not self._is_connected(user_id, channel_id):
+                        self._close_session(user_id, channel_id)
+                        stale.append((user_id, channel_id, joined_at))
+            await self.journal.delete_joins(stale)
+
+            now = datetime.now(timezone.utc).timestamp()
+            rows = []
+            all_guilds = await self.config.all_guilds()
+            for guild in self.bot.guilds:
+                if not all_guilds.get(guild.id, {}).get("toggle", False):
+                    continue
+                for voice_channel in guild.voice_channels:
+                    for member in voice_channel.members:
+                        if voice_channel.id not in self._open_sessions.get(member.id, {}):
+                            self._open_session(member.id, voice_channel.id, voice_channel.name, now)
+                            rows.append((member.id, voice_channel.id, voice_channel.name, JOIN, now, None))
+            await self.journal.append(rows)
+            log.debug(f"Dropped {len(stale)} stale voice sessions and opened {len(rows)} new ones.")
+        except Exception as e:
+            log.error(f"Error in _reconcile_sessions:\n{e}", exc_info=True)
+        finally:
+            self._ready.set()
+
+    def _is_connected(self, user_id: int, channel_id: int):
+        channel = self.bot.get_channel(channel_id)
+        if not isinstance(channel, discord.VoiceChannel):
+            return False
+        member = channel.guild.get_member(user_id)
+        return bool(member and member.voice and member.voice.channel and member.voice.channel.id == channel_id)
+
+    def _open_session(self, user_id: int, channel_id: int, channel_name: str, joined_at: float):
+        self._open_sessions.setdefault(user_id, {})[channel_id] = (channel_name, joined_at)
+        self._channel_sessions.setdefault(channel_id, {})[user_id] = joined_at
+
+    def _close_session(self, user_id: int, channel_id: int):
+        """Returns (channel_name, joined_at), or None if there was no open session."""
+        user_sessions = self._open_sessions.get(user_id, {})
+        session = user_sessions.pop(channel_id, None)
+        if not user_sessions:
+            self._open_sessions.pop(user_id, None)
+        channel_sessions = self._channel_sessions.get(channel_id, {})
+        channel_sessions.pop(user_id, None)
+        if not channel_sessions:
+            self._channel_sessions.pop(channel_id, None)
+        return session
+
+    async def _migrate_history(self):
+        """Move the per-user history lists from Config into the journal."""
+        rows = []
+        for user_id, user_data in (await self.config.all_users()).items():
+            for entry in user_data["history"]:
+                channel = (user_id, entry["channel_id"], entry["channel_name"])
+                rows.append((*channel, JOIN, entry["joined_at"], None))
+                if entry.get("left_at") is not None:
+                    rows.append((*channel, LEAVE, entry["left_at"], entry["joined_at"]))
+        await self.journal.append(rows)
+        await self.config.journal_migrated.set(True)
+        await self.config.clear_all_users()
+
+    def cog_unload(self):
+        self._cleanup_task.cancel()
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+        asyncio.ensure_future(self.journal.close())
 
     # Commands
     @commands.group(name="voicelog", aliases=["voicelogs"])
@@ -72,7 +179,10 @@ class VoiceLogs(commands.Cog):
 
         Timestamps are in UTC.
         """
-        entries = await self.config.user(user).history()
+        await self._ready.wait()
+        entries = await self.journal.get_user_sessions(user.id, limit=25)
+        for channel_id, (channel_name, joined_at) in self._open_sessions.get(user.id, {}).items():
+            entries.append({"channel_id": channel_id, "channel_name": channel_name, "joined_at": joined_at})
         embed = discord.Embed(description=f"**Voice Activity for** {user.mention}")
         for entry in self.process_entries(entries, limit=25):
             joined_at = self.format_time(entry["joined_at"])
@@ -95,15 +205,11 @@ class VoiceLogs(commands.Cog):
 
         `voice_channel_name_or_id` is either the exact name of the target voice channel (proper case), or its ID.
         """
-        entries = []
-        all_entries = await self.config.all_users()
-
-        for user_id, user_entries in all_entries.items():
-            for history_key, entry_list in user_entries.items():
-                for entry in entry_list:
-                    if entry["channel_id"] == voice_channel_name_or_id.id:
-                        entry["user_id"] = user_id
-                        entries.append(entry)
+        await self._ready.wait()
+        channel_id = voice_channel_name_or_id.id
+        entries = await self.journal.get_channel_sessions(channel_id, limit=25)
+        for user_id, joined_at in self._channel_sessions.get(channel_id, {}).items():
+            entries.append({"user_id": user_id, "joined_at": joined_at})
 
         embed = discord.Embed(title=f"Voice Activity in {voice_channel_name_or_id.name}", description="")
         for entry in self.process_entries(entries, limit=25):
@@ -122,14 +228,95 @@ class VoiceLogs(commands.Cog):
             embed.description = f"No voice activity in {voice_channel_name_or_id.mention}"
         await ctx.send(embed=embed)
 
+    @_command_voicelog.command(name="usage")
+    @checks.mod_or_permissions(view_audit_log=True)
+    async def _command_voicelog_usage(self, ctx: commands.Context, voice_channel: discord.VoiceChannel, days: int = 7):
+        """
+        Total time each user spent in a voice channel over the last few days.
+
+        Use quotes around a channel name with spaces. Voice activity is kept for a week.
+        """
+        await self._ready.wait()
+        start, now = self._get_window(days)
+        totals = {}
+        for user_id, joined_at, left_at in await self._get_window_sessions(voice_channel.id, start, now):
+            totals[user_id] = totals.get(user_id, 0) + left_at - max(joined_at, start)
+
+        embed = discord.Embed(title=f"Time Spent in {voice_channel.name}", description="")
+        for user_id, total in heapq.nlargest(25, totals.items(), key=lambda item: item[1]):
+            user_obj = ctx.guild.get_member(user_id)
+            if not user_obj:
+                user_obj = SimpleNamespace(name="Unknown User", id=user_id)
+            embed.description += f"**{user_obj.name}** ({user_obj.id}) for **{self.humanize_time(round(total))}**\n"
+        if len(embed.description) == 0:
+            embed.description = f"No voice activity in {voice_channel.mention}"
+        await ctx.send(embed=embed)
+
+    @_command_voicelog.command(name="peak")
+    @checks.mod_or_permissions(view_audit_log=True)
+    async def _command_voicelog_peak(self, ctx: commands.Context, voice_channel: discord.VoiceChannel, days: int = 7):
+        """
+        The most users connected to a voice channel at once over the last few days.
+
+        Use quotes around a channel name with spaces. Voice activity is kept for a week.
+        """
+        await self._ready.wait()
+        start, now = self._get_window(days)
+        # +1 on every join and -1 on every leave, leaves sorting first when they happen at the same moment
+        changes = []
+        for _, joined_at, left_at in await self._get_window_sessions(voice_channel.id, start, now):
+            changes.append((max(joined_at, start), 1))
+            changes.append((left_at, -1))
+        changes.sort()
+
+        peak, peak_at, connected = 0, None, 0
+        for moment, change in changes:
+            connected += change
+            if connected > peak:
+                peak, peak_at = connected, moment
+        if not peak:
+            await ctx.send(f"No voice activity in {voice_channel.mention} in the last {days} day(s).")
+            return
+        peak_time = self.format_time(datetime.fromtimestamp(peak_at, timezone.utc))
+        await ctx.send(f"Peak of {bold(str(peak))} users in {voice_channel.mention}, reached {peak_time} UTC.")
+
+    def _get_window(self, days: int):
+        """Helper for voicelog usage/peak: (start, end) timestamps of the last days, up to the retention limit."""
+        now = datetime.now(timezone.utc)
+        days = max(1, min(days, self.ENTRY_TIME_LIMIT.days))
+        return (now - timedelta(days=days)).timestamp(), now.timestamp()
+
+    async def _get_window_sessions(self, channel_id: int, start: float, now: float):
+        """Helper for voicelog usage/peak: (user_id, joined_at, left_at) of every session in the channel since start."""
+        sessions = await self.journal.get_channel_sessions_since(channel_id, start)
+        for user_id, joined_at in self._channel_sessions.get(channel_id, {}).items():
+            if joined_at < start:
+                # a join with no leave from before the window is more likely a missed leave than a week-long call
+                continue
+            sessions.append((user_id, joined_at, now))
+        return sessions
+
     @_command_voicelog.command(name="toggle")
     @checks.mod_or_permissions(view_audit_log=True)
     async def _command_voicelog_toggle(self, ctx: commands.Context):
         """Toggle voice activity recording on and off."""
         toggle = await self.config.guild(ctx.guild).toggle()
         await self.config.guild(ctx.guild).toggle.set(not toggle)
+        if toggle:
+            # leaves aren't recorded while watching is off, so the sessions going on now end here
+            await self._close_guild_sessions(ctx.guild)
         await ctx.send(f"Voice channel watching is now toggled {bold('ON') if toggle == False else bold('OFF')}")
 
+    async def _close_guild_sessions(self, guild: discord.Guild):
+        await self._ready.wait()
+        now = datetime.now(timezone.utc).timestamp()
+        rows = []
+        for voice_channel in guild.voice_channels:
+            for user_id in list(self._channel_sessions.get(voice_channel.id, {})):
+                channel_name, joined_at = self._close_session(user_id, voice_channel.id)
+                rows.append((user_id, voice_channel.id, channel_name, LEAVE, now, joined_at))
+        await self.journal.append(rows)
+
     # Events
     @commands.Cog.listener()
     async def on_voice_state_update(
@@ -143,24 +330,24 @@ class VoiceLogs(commands.Cog):
             return
 
         try:
+            await self._ready.wait()
+            now = datetime.now(timezone.utc).timestamp()
+            rows = []
+
             # Left that channel
             if before.channel is not None:
-                async with self.config.user(member).history() as user_data:
-                    entry = discord.utils.find(
-                        lambda e: e["channel_id"] == before.channel.id and "left_at" not in e, user_data
-                    )
-                    if entry is not None:
-                        entry["left_at"] = datetime.now(timezone.utc).timestamp()
+                session = self._close_session(member.id, before.channel.id)
+                if session is not None:
+                    channel_name, joined_at = session
+                    rows.append((member.id, before.channel.id, channel_name, LEAVE, now, joined_at))
 
             # Joined that channel
             if after.channel is not None:
-                async with self.config.user(member).history() as user_info:
-                    entry = {
-                        "channel_id": after.channel.id,
-                        "channel_name": after.channel.name,
-                        "joined_at": datetime.now(timezone.utc).timestamp(),
-                    }
-                    user_info.append(entry)
+                self._open_session(member.id, after.channel.id, after.channel.name, now)
+                rows.append((member.id, after.channel.id, after.channel.name, JOIN, now, None))
+
+            if rows:
+                await self.journal.append(rows)
 
         except Exception as e:
             log.error(f"Error in on_voice_state_update:\n{e}", exc_info=True)
@@ -179,22 +366,22 @@ class VoiceLogs(commands.Cog):
 
     async def cleanup_entries(self):
         try:
+            await self._ready.wait()
             delete_threshold = datetime.now(timezone.utc) - self.ENTRY_TIME_LIMIT
-            to_delete = {"history": []}
-            user_data = await self.config.all_users()
-            for user_id, history in user_data.items():
-                for dict_title, entry_list in history.items():
-                    for entry in entry_list:
-                        left_at = entry.get("left_at", None)
-                        if left_at is not None and datetime.fromtimestamp(left_at, timezone.utc) < delete_threshold:
-                            entry_list_index = [i for i, d in enumerate(entry_list) if left_at in d.values()]
-                            entry_list.pop(entry_list_index[0])
-                    await self.config.user_from_id(user_id).history.set(entry_list)
+            deleted = await self.journal.delete_before(delete_threshold.timestamp())
+            # their join rows are gone, so the sessions can't be closed later on anyway
+            for user_id, sessions in list(self._open_sessions.items()):
+                for channel_id, (_, joined_at) in list(sessions.items()):
+                    if joined_at < delete_threshold.timestamp():
+                        self._close_session(user_id, channel_id)
+            log.debug(f"Deleted {deleted} expired voice journal rows.")
         except Exception as e:
             log.error(f"Error in cleanup_entries:\n{e}", exc_info=True)
 
     def process_entries(self, entries, *, limit=None):
-        return sorted(self.map_entries(entries), key=lambda o: o["joined_at"], reverse=True)[:limit]
+        if limit is None:
+            return sorted(self.map_entries(entries), key=lambda o: o["joined_at"], reverse=True)
+        return heapq.nlargest(limit, self.map_entries(entries), key=lambda o: o["joined_at"])
 
     def map_entries(self, entries):
         for entry in entries: